@@ -39,6 +39,20 @@ export default function ChatPage() {
     }
   };
 
+  // Poll the ingestion job until the document is ready (or failed)
+  const waitForIngestion = async (jobId, pdfId, status) => {
+    while (status !== "ready") {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const job = await api.get(`/jobs/${jobId}`);
+
+      if (job.data.status === "failed") return null;
+      if (job.data.status === "done") break;
+    }
+
+    const res = await api.get("/documents");
+    return (res.data || []).find((d) => d.pdf_id === pdfId) || null;
+  };
+
   // PDF Upload Handler
   const handleFileUpload = async (file) => {
     if (!file) return;
@@ -54,16 +68,34 @@ export default function ChatPage() {
 
       const newDoc = {
         pdf_id: res.data.pdf_id,
-        title: res.data.title,
+        title: "Processing...",
         file_name: res.data.file_name,
-        summary: res.data.summary,
+        summary: "",
+        status: res.data.status,
       };
 
       setDocuments((prev) => [newDoc, ...prev]);
       setActiveDoc(newDoc);
-      setSummary(res.data.summary);
+      setSummary("Processing your PDF...");
       setMessages([]);
       setIsSummaryOpen(true);
+
+      const readyDoc = await waitForIngestion(
+        res.data.job_id,
+        res.data.pdf_id,
+        res.data.status
+      );
+      if (readyDoc) {
+        setDocuments((prev) =>
+          prev.map((d) => (d.pdf_id === readyDoc.pdf_id ? readyDoc : d))
+        );
+        setActiveDoc((current) =>
+          current?.pdf_id === readyDoc.pdf_id ? readyDoc : current
+        );
+        setSummary(readyDoc.summary || "No summary available.");
+      } else {
+        alert("Failed to process PDF");
+      }
     } catch (err) {
       alert("Failed to upload PDF");
       console.error(err);
@@ -132,11 +164,18 @@ export default function ChatPage() {
         study_mode: isStudyMode,
       });
 
+      // Large documents can be queried while the rest of the pages are still being indexed
+      const coverage = res.data.coverage;
+      const coverageNote =
+        coverage && !coverage.complete
+          ? `\n\n(Answered from the first ${coverage.indexed_pages} of ${coverage.total_pages} pages; the rest is still being indexed.)`
+          : "";
+
       setMessages((prev) => [
         ...prev,
         {
           role: "assistant",
-          content: res.data.answer,
+          content: res.data.answer + coverageNote,
           sources: res.data.source_documents || res.data.sources || [],
         },
       ]);
@@ -1,6 +1,7 @@
 import os
 import uvicorn
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sympy.codegen import Print
@@ -8,6 +9,13 @@ from sympy.codegen import Print
 from server.api.routes import router as api_router
 from server.api.userRoutes import router as user_router
 from server.utils.db import connect_to_mongo, close_mongoconnection
+from server.utils.embeddingRegistry import warm_up_embedding_models
+from server.utils.ingestionJobs import shutdown_ingestion_executor, start_job_recovery, stop_job_recovery
+from server.utils.pdfExtraction import shutdown_extraction_pool
+from server.utils.auth import start_revocation_sync, stop_revocation_sync
+from server.utils.cryptoExecutor import shutdown_crypto_executor
+from server.utils.externalContext import shutdown_external_context_executor
+from server.utils.documentCleanup import start_garbage_collector, stop_garbage_collector
 from server.utils.config import DOTENV_PATH, GEMINAI_API_KEY, GEMINAI_MODEL, EMBEDDING_MODEL, MONGO_URI, MONGO_DB_NAME
 
 app = FastAPI(title="Research Assistant API")
@@ -35,6 +43,12 @@ app.add_middleware(
 async def startup_event():
     try:
         await connect_to_mongo()
+        start_revocation_sync()
+        start_garbage_collector()
+        # Picks up ingestion jobs left queued/running by a previous process
+        start_job_recovery()
+        # Load embedding weights once per worker instead of on the first upload/chat
+        await run_in_threadpool(warm_up_embedding_models)
         print("[SUCCESS] Research Assistant API is starting up.")
     except Exception as e:
         print(f"[ERROR] An error occurred during startup: {e}")
@@ -43,6 +57,13 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     try:
+        stop_revocation_sync()
+        stop_garbage_collector()
+        stop_job_recovery()
+        shutdown_ingestion_executor()
+        shutdown_extraction_pool()
+        shutdown_crypto_executor()
+        shutdown_external_context_executor()
         await close_mongoconnection()
         print("[SUCCESS] Research Assistant API is shutting down.")
     except Exception as e:
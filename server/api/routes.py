@@ -1,73 +1,171 @@
+import os
+import json
 from datetime import datetime
-import re
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, status
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Query, status
 from fastapi.params import Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from server.schemas.QuestionSchema import QuestionSchema
 from server.schemas.AnswerSchema import AnswerSchema
-from server.schemas.SummarySchema import SummarySchema
-from server.utils.PDFProcess import save_pdf_file, process_pdf_to_vector_db
+from server.schemas.JobSchema import UploadJobSchema, JobStatusSchema
+from server.utils.PDFProcess import save_pdf_file, load_document_profile, vector_store_cache
+from server.utils.answerCache import answer_cache, embed_question
 from server.utils.auth import get_current_user
+from server.utils.cryptoExecutor import get_crypto_stats
 from server.utils.db import db_instance
-from server.utils.llm import generate_structured_summary, get_answer_from_pdf
-from server.utils.chatHistory import save_chat_message, get_chat_history, clear_chat_history
+from server.utils.documentCleanup import cascade_delete_blob, get_gc_report
+from server.utils.ingestionJobs import enqueue_ingestion_job, get_ingestion_job, take_over_stalled_blob
+from server.utils.pdfBlobs import acquire_pdf_blob, release_pdf_blob, get_pdf_blob
+from server.utils.llm import aget_answer_from_pdf, astream_answer_from_pdf
+from server.utils.chatHistory import save_chat_message, get_chat_history_page, clear_chat_history
+from server.utils.conversationMemory import get_prompt_history, compact_conversation
 from server.utils.promptSanitizer import sanitizePrompt
+from server.utils.QAScript import get_evaluator_stats
 
 router = APIRouter()
 
 
-@router.post("/upload", response_model=SummarySchema)
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def get_chat_ready_pdf(pdf_id: str, current_user: dict) -> dict:
+    pdf_record = await db_instance.db["pdfs"].find_one({
+        "pdf_id": pdf_id,
+        "user_id": current_user["_id"]
+    })
+
+    if not pdf_record:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have access to this PDF document."
+        )
+
+    pdf_status = pdf_record.get("status", "ready")
+    # Large documents can be queried as soon as their first pages are indexed
+    partially_indexed = pdf_status == "processing" and pdf_record.get("indexed_pages", 0) > 0
+    if pdf_status != "ready" and not partially_indexed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Document processing failed." if pdf_status == "failed"
+            else "Document is still being processed. Please try again shortly."
+        )
+
+    return pdf_record
+
+
+def get_coverage(pdf_record: dict) -> dict:
+    indexed_pages = pdf_record.get("indexed_pages")
+    total_pages = pdf_record.get("total_pages")
+    complete = pdf_record.get("status", "ready") == "ready" or (
+        total_pages is not None and indexed_pages is not None and indexed_pages >= total_pages
+    )
+    return {"indexed_pages": indexed_pages, "total_pages": total_pages, "complete": complete}
+
+
+async def get_document_profile(pdf_record: dict):
+    profile = pdf_record.get("profile")
+
+    if profile is None:
+        # One-off backfill for documents ingested before profiles were cached at ingestion
+        # (an empty profile is stored when the file is gone, so the scan is not repeated every turn)
+        profile = await run_in_threadpool(load_document_profile, pdf_record.get("vector_id", pdf_record["pdf_id"])) or {}
+        await db_instance.db["pdfs"].update_one({"pdf_id": pdf_record["pdf_id"]}, {"$set": {"profile": profile}})
+
+    return profile
+
+
+@router.post("/upload", response_model=UploadJobSchema, status_code=status.HTTP_202_ACCEPTED)
 async def upload_pdf(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
     try:
-        # print("[DEBUG] inside try block")
-        # 1. Save File
-        pdf_id, file_path = await save_pdf_file(file)
-        # print(f"[DEBUG] file_path: {file_path} & pdf_id: {pdf_id}")
-        # 2. Process Vectors (Compute intensive - strictly, should be background task,
-        # but for this assignment we await to ensure RAG is ready immediately)
-        process_pdf_to_vector_db(file_path, pdf_id)
-
-        # print("[DEBUG] after process_pdf_to_vector_db")
-        # 3. Generate Summary
-        summary_text = generate_structured_summary(file_path)
-        # print("[DEBUG] filepath passed")
-
-        match = re.search(r"\*\*Title:\*\*\s*(.*)", summary_text)
-        if match:
-            title = match.group(1).strip()
-        else:
-            title = "Unknown Title"
+        # 1. Save File (hashed while it streams to disk)
+        pdf_id, file_path, content_hash = await save_pdf_file(file)
+
+        # 2. Reuse the vectors and summary of an identical earlier upload, if any
+        blob = await acquire_pdf_blob(content_hash, pdf_id, file_path)
+        vector_id = blob["vector_id"]
+        is_duplicate = vector_id != pdf_id
 
+        # A duplicate of a document still "processing" must not wait on a job whose worker died
+        adopted = False
+        if is_duplicate and blob["status"] == "processing":
+            adopted = await take_over_stalled_blob(blob, current_user["_id"], file_path)
+
+        if is_duplicate and not adopted and os.path.exists(file_path):
+            os.remove(file_path)
+
+        # 3. Register the document; it becomes chat-able once the ingestion job marks it "ready"
         pdf_document = {
             "pdf_id": pdf_id,
             "user_id": current_user["_id"],
             "filename": file.filename,
-            "title": title,
-            "summary": summary_text,
+            "title": blob["title"],
+            "summary": blob["summary"],
+            "status": blob["status"],
+            "content_hash": content_hash,
+            "vector_id": vector_id,
+            "job_id": blob["job_id"],
+            "profile": blob.get("profile"),
+            "indexed_pages": blob.get("indexed_pages", 0),
+            "total_pages": blob.get("total_pages"),
             "created_at": datetime.utcnow()
         }
-
         await db_instance.db["pdfs"].insert_one(pdf_document)
-        # print("[DEBUG] PDF document inserted into DB")
 
-        QuestionSchema(pdf_id=pdf_id, question="")
-
-        return SummarySchema(
+        if is_duplicate and pdf_document["status"] == "processing":
+            # The job may have finished between acquiring the blob and inserting this record, in which
+            # case its update of every record sharing the vectors missed this one
+            current = await get_pdf_blob(vector_id)
+            if current is None or current["status"] == "ready":
+                fields = {"status": "failed"} if current is None else {
+                    "status": "ready",
+                    **{key: current.get(key) for key in ("title", "summary", "profile", "indexed_pages", "total_pages")}
+                }
+                await db_instance.db["pdfs"].update_one({"pdf_id": pdf_id, "status": "processing"}, {"$set": fields})
+                pdf_document["status"] = fields["status"]
+
+        # 4. Parse, split, embed and summarize on the ingestion worker pool (new content only)
+        if not is_duplicate:
+            await enqueue_ingestion_job(vector_id, current_user["_id"], file_path, job_id=blob["job_id"])
+
+        return UploadJobSchema(
             pdf_id=pdf_id,
-            title=title,
+            job_id=pdf_document["job_id"],
             file_name=file.filename,
-            summary=summary_text
+            status=pdf_document["status"]
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/jobs/{job_id}", response_model=JobStatusSchema)
+async def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await get_ingestion_job(job_id)
+
+    # Deduplicated uploads share the job of the first uploader, so authorise through the pdfs record
+    pdf_record = await db_instance.db["pdfs"].find_one({
+        "job_id": job_id,
+        "user_id": current_user["_id"]
+    }) if job else None
+
+    if not pdf_record:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+
+    job["pdf_id"] = pdf_record["pdf_id"]
+    return JobStatusSchema(**job)
+
+
 @router.post("/chat", response_model=AnswerSchema)
-async def chat_with_pdf(request: QuestionSchema, current_user: dict = Depends(get_current_user)):
+async def chat_with_pdf(request: QuestionSchema, background_tasks: BackgroundTasks,
+                        current_user: dict = Depends(get_current_user)):
     try:
         # print("[DEBUG] Received question:", request.question)
         # Sanitize input (basic)
@@ -80,24 +178,29 @@ async def chat_with_pdf(request: QuestionSchema, current_user: dict = Depends(ge
 
         clean_question = sanitizePrompt(question)
 
-        pdf_record = await db_instance.db["pdfs"].find_one({
-            "pdf_id": request.pdf_id,
-            "user_id": current_user["_id"]
-        })
-
-        if not pdf_record:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You do not have access to this PDF document."
-            )
+        pdf_record = await get_chat_ready_pdf(request.pdf_id, current_user)
+        coverage = get_coverage(pdf_record)
 
         # Get History
-        history = await get_chat_history(request.pdf_id)
+        history = await get_prompt_history(request.pdf_id)
         # print("[DEBUG] Chat history retrieved:", history)
 
+        # Study mode mixes in live web results and partially indexed documents give partial answers,
+        # so only plain answers over the whole document are cached
+        question_embedding = None
+        result = None
+        if not request.study_mode and coverage["complete"]:
+            question_embedding = await embed_question(clean_question)
+            result = answer_cache.lookup(request.pdf_id, question_embedding)
+
         # Get RAG Answer
-        result = get_answer_from_pdf(question=clean_question, pdf_id=request.pdf_id, chat_history=history,
-                                     study_mode=request.study_mode)
+        if result is None:
+            result = await aget_answer_from_pdf(question=clean_question,
+                                                pdf_id=pdf_record.get("vector_id", request.pdf_id),
+                                                chat_history=history, profile=await get_document_profile(pdf_record),
+                                                study_mode=request.study_mode)
+            if question_embedding is not None and result.get("approved"):
+                answer_cache.store(request.pdf_id, question_embedding, result)
         # print("[DEBUG] Answer retrieved:", result)
         answer_text = result['result']
         source_documents = result['source_documents']
@@ -111,16 +214,99 @@ async def chat_with_pdf(request: QuestionSchema, current_user: dict = Depends(ge
         await save_chat_message(request.pdf_id, "assistant", answer_text, sources=source_documents)
         # print("[DEBUG] AI response saved")
 
+        # Fold turns that left the history window into the rolling summary, after responding
+        background_tasks.add_task(compact_conversation, request.pdf_id)
+
         return AnswerSchema(
             answer=answer_text,
-            source_documents=source_documents
+            source_documents=source_documents,
+            coverage=coverage
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/stream")
+async def chat_with_pdf_stream(request: QuestionSchema, background_tasks: BackgroundTasks,
+                               current_user: dict = Depends(get_current_user)):
+    question = request.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    clean_question = sanitizePrompt(question)
+    pdf_record = await get_chat_ready_pdf(request.pdf_id, current_user)
+    coverage = get_coverage(pdf_record)
+
+    history = await get_prompt_history(request.pdf_id)
+    profile = await get_document_profile(pdf_record)
+
+    async def stream_cached_answer(cached: dict):
+        yield "sources", cached["source_documents"]
+        yield "token", cached["result"]
+        yield "verdict", {"accepted": True, "cached": True}
+
+    async def event_stream():
+        answer_parts = []
+        source_documents = []
+        accepted = False
+
+        try:
+            yield format_sse("coverage", coverage)
+
+            question_embedding = None
+            cached = None
+            if not request.study_mode and coverage["complete"]:
+                question_embedding = await embed_question(clean_question)
+                cached = answer_cache.lookup(request.pdf_id, question_embedding)
+
+            if cached is not None:
+                events = stream_cached_answer(cached)
+            else:
+                events = astream_answer_from_pdf(question=clean_question,
+                                                 pdf_id=pdf_record.get("vector_id", request.pdf_id),
+                                                 chat_history=history, profile=profile,
+                                                 study_mode=request.study_mode)
+
+            async for event, data in events:
+                if event == "sources":
+                    source_documents = data
+                elif event == "token":
+                    answer_parts.append(data)
+                elif event == "verdict":
+                    accepted = data.get("accepted", False)
+                yield format_sse(event, data)
+
+            if cached is None and question_embedding is not None and accepted:
+                answer_cache.store(request.pdf_id, question_embedding, {
+                    "result": "".join(answer_parts),
+                    "source_documents": source_documents
+                })
+
+            # Persist the full exchange once the answer is complete
+            await save_chat_message(request.pdf_id, "user", clean_question)
+            await save_chat_message(request.pdf_id, "assistant", "".join(answer_parts), sources=source_documents)
+        except Exception as e:
+            print(f"Error: {e}")
+            yield format_sse("error", {"detail": str(e)})
+            return
+
+        yield format_sse("done", {"answer": "".join(answer_parts)})
+
+    # Runs once the stream has finished (and the exchange has been saved)
+    background_tasks.add_task(compact_conversation, request.pdf_id)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so nginx forwards tokens as soon as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/documents")
 async def get_user_documents(current_user: dict = Depends(get_current_user)):
     try:
@@ -135,6 +321,9 @@ async def get_user_documents(current_user: dict = Depends(get_current_user)):
                 "title": doc["title"],
                 "file_name": doc["filename"],
                 "summary": doc["summary"],
+                "status": doc.get("status", "ready"),
+                "job_id": doc.get("job_id"),
+                "coverage": get_coverage(doc),
                 "created_at": doc["created_at"]
             })
 
@@ -145,7 +334,8 @@ async def get_user_documents(current_user: dict = Depends(get_current_user)):
 
 
 @router.get("/history/{pdf_id}")
-async def get_history_by_id(pdf_id: str, current_user: dict = Depends(get_current_user)):
+async def get_history_by_id(pdf_id: str, limit: int = Query(50, ge=1, le=200), cursor: Optional[str] = None,
+                            current_user: dict = Depends(get_current_user)):
     pdf_record = await db_instance.db["pdfs"].find_one({
         "pdf_id": pdf_id,
         "user_id": current_user["_id"]
@@ -157,7 +347,10 @@ async def get_history_by_id(pdf_id: str, current_user: dict = Depends(get_curren
             detail="You do not have access to this PDF document."
         )
 
-    history = await get_chat_history(pdf_id)
+    try:
+        history, next_cursor = await get_chat_history_page(pdf_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
 
     formatted_history = []
     for msg in history:
@@ -171,12 +364,15 @@ async def get_history_by_id(pdf_id: str, current_user: dict = Depends(get_curren
     return {
         "pdf_id": pdf_id,
         "title": pdf_record.get("title"),
-        "history": formatted_history
+        "history": formatted_history,
+        # Pass back as ?cursor= to load older messages; None when the oldest page was returned
+        "next_cursor": next_cursor
     }
 
 
 @router.delete("/document/{pdf_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_document(pdf_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_document(pdf_id: str, background_tasks: BackgroundTasks,
+                          current_user: dict = Depends(get_current_user)):
     try:
         pdf_record = await db_instance.db["pdfs"].find_one({
             "pdf_id": pdf_id,
@@ -190,10 +386,32 @@ async def delete_document(pdf_id: str, current_user: dict = Depends(get_current_
             )
 
         await clear_chat_history(pdf_id)
+        answer_cache.invalidate(pdf_id)
 
         await db_instance.db["pdfs"].delete_one({"pdf_id": pdf_id, "user_id": current_user["_id"]})
 
+        # Vectors, the uploaded file and job records go once nothing references them any more,
+        # after the response has been sent
+        if pdf_record.get("content_hash"):
+            if await release_pdf_blob(pdf_record["content_hash"], pdf_record["vector_id"]):
+                background_tasks.add_task(cascade_delete_blob, pdf_record["vector_id"])
+        else:
+            background_tasks.add_task(cascade_delete_blob, pdf_id)
+
         return None
+    except HTTPException:
+        raise
     except Exception as e:
         # print(f"[ERROR] Deleting document:{e}")
         raise HTTPException(status_code=500, detail=f"Failed to delete document: {e}")
+
+
+@router.get("/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_user)):
+    return {
+        "vector_store_cache": vector_store_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "evaluator": get_evaluator_stats(),
+        "crypto_executor": get_crypto_stats(),
+        "garbage_collection": get_gc_report()
+    }
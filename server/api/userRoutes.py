@@ -6,9 +6,9 @@ from fastapi_mail import MessageSchema, MessageType, FastMail
 from server.utils.db import db_instance
 from server.schemas.UserSchema import (UserCreateSchema, UserOutputSchema, UserLoginSchema, TokenSchema,
                                        UserUpdateSchema, OTPVerifySchema, OTPSendSchema)
-from server.utils.security import (get_password_hash, verify_password, create_access_token,
-                                   generate_otp, encrypt_message, decrypt_message)
-from server.utils.auth import get_current_user, oauth2_scheme
+from server.utils.security import (aget_password_hash, averify_password, create_access_token,
+                                   generate_otp, aencrypt_message, adecrypt_message)
+from server.utils.auth import get_current_user, oauth2_scheme, revoke_token, invalidate_user
 from server.utils.mailConfig import conf
 from server.utils.emailTemplates import loginTemplate, registrationTemplate
 
@@ -23,7 +23,7 @@ async def register_user(user: UserCreateSchema, background_tasks: BackgroundTask
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user_dict = user.dict()
-    user_dict["password"] = get_password_hash(user.password)
+    user_dict["password"] = await aget_password_hash(user.password)
     user_dict["created_at"] = datetime.utcnow()
     user_dict["updated_at"] = datetime.utcnow()
 
@@ -36,7 +36,7 @@ async def register_user(user: UserCreateSchema, background_tasks: BackgroundTask
     # Generate OTP immediately upon registration
     otp_code = generate_otp()
 
-    encripted_otp = encrypt_message(otp_code)
+    encripted_otp = await aencrypt_message(otp_code)
 
     user_dict["otp_code"] = encripted_otp
     user_dict["otp_expires_at"] = datetime.utcnow() + timedelta(minutes=5)
@@ -61,7 +61,7 @@ async def register_user(user: UserCreateSchema, background_tasks: BackgroundTask
 async def login_user(login_data: UserLoginSchema, background_tasks: BackgroundTasks):
     user = await db_instance.db["users"].find_one({"email": login_data.email})
 
-    if not user or not verify_password(login_data.password, user["password"]):
+    if not user or not await averify_password(login_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -75,7 +75,7 @@ async def login_user(login_data: UserLoginSchema, background_tasks: BackgroundTa
     otp_code = generate_otp()
     expiration_time = datetime.utcnow() + timedelta(minutes=5)
 
-    encripted_otp = encrypt_message(otp_code)
+    encripted_otp = await aencrypt_message(otp_code)
 
     await db_instance.db["users"].update_one(
         {"email": login_data.email},
@@ -102,14 +102,8 @@ async def read_users_me(current_user: dict = Depends(get_current_user)):
 
 @router.post("/logout", status_code=status.HTTP_201_CREATED)
 async def logout(token: str = Depends(oauth2_scheme)):
-    # await db_instance.db["token_blacklist"].create_index("blacklisted_at", expireAfterSeconds=86400)
-
-    existing = await db_instance.db["token_blacklist"].find_one({"token": token})
-    if not existing:
-        await db_instance.db["token_blacklist"].insert_one({
-            "token": token,
-            "blacklisted_at": datetime.utcnow(),
-        })
+    # Expiry of blacklist entries is handled by the TTL index declared in server.utils.db
+    await revoke_token(token)
 
     return {"message": "Successfully logged out"}
 
@@ -132,6 +126,8 @@ async def update_user(
         {"$set": data_to_update}
     )
 
+    invalidate_user(current_user["_id"])
+
     updated_user = await db_instance.db["users"].find_one({"_id": ObjectId(current_user["_id"])})
     updated_user["_id"] = str(updated_user["_id"])
     return updated_user
@@ -140,6 +136,7 @@ async def update_user(
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(current_user: dict = Depends(get_current_user)):
     await db_instance.db["users"].delete_one({"_id": ObjectId(current_user["_id"])})
+    invalidate_user(current_user["_id"])
     return None
 
 
@@ -186,7 +183,7 @@ async def verify_otp(otp_data: OTPVerifySchema):
     stored_otp = user.get("otp_code")
     expiry = user.get("otp_expires_at")
 
-    decrypted_otp = decrypt_message(stored_otp) if stored_otp else None
+    decrypted_otp = await adecrypt_message(stored_otp) if stored_otp else None
 
     if not decrypted_otp or not expiry:
         raise HTTPException(status_code=400, detail="No OTP requested")
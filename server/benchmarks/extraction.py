@@ -0,0 +1,80 @@
+"""
+Compares PDF loaders on synthetic 10/100/1000-page documents:
+
+- PyMuPDFLoader: the single-threaded loader ingestion used before pdfExtraction
+- in-process: iter_page_ranges with the pool disabled (EXTRACTION_PROCESSES=1)
+- process pool: iter_page_ranges across EXTRACTION_PROCESSES workers
+
+    python -m server.benchmarks.extraction [--pages 10,100,1000] [--repeat 3]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from langchain_community.document_loaders import PyMuPDFLoader
+
+from server.utils import pdfExtraction
+from server.utils.config import EXTRACTION_PROCESSES
+from server.benchmarks.syntheticPdf import synthetic_pdf_path
+
+
+def load_with_pymupdf_loader(file_path: str) -> int:
+    return len(PyMuPDFLoader(file_path).load())
+
+
+def load_in_process(file_path: str) -> int:
+    pdfExtraction.EXTRACTION_PROCESSES = 1
+    try:
+        return sum(1 for _ in pdfExtraction.iter_page_ranges(file_path))
+    finally:
+        pdfExtraction.EXTRACTION_PROCESSES = EXTRACTION_PROCESSES
+
+
+def load_with_pool(file_path: str) -> int:
+    return sum(1 for _ in pdfExtraction.iter_page_ranges(file_path))
+
+
+LOADERS = {
+    "PyMuPDFLoader": load_with_pymupdf_loader,
+    "in-process": load_in_process,
+    f"pool ({EXTRACTION_PROCESSES} procs)": load_with_pool,
+}
+
+
+def best_of(loader, file_path: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        loader(file_path)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PDF loaders on synthetic documents.")
+    parser.add_argument("--pages", default="10,100,1000", help="comma separated page counts")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="extraction_benchmark_")
+    try:
+        # Start the workers up front so process spawning is not charged to the first document
+        load_with_pool(synthetic_pdf_path(directory, pdfExtraction.EXTRACTION_PAGES_PER_RANGE * 2))
+
+        print(f"{'pages':>6}" + "".join(f"{name:>22}" for name in LOADERS))
+        for pages in [int(n) for n in args.pages.split(",")]:
+            file_path = synthetic_pdf_path(directory, pages)
+            cells = []
+            for loader in LOADERS.values():
+                seconds = best_of(loader, file_path, args.repeat)
+                cells.append(f"{seconds:.3f}s {pages / seconds:,.0f}p/s")
+            print(f"{pages:>6}" + "".join(f"{cell:>22}" for cell in cells), flush=True)
+    finally:
+        pdfExtraction.shutdown_extraction_pool()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Shows the query plans of the hot Mongo queries before and after `REQUIRED_INDEXES`.
+
+Seeds a scratch database with synthetic documents, explains every query without indexes
+(COLLSCAN) and again with them (IXSCAN), then drops the scratch database.
+
+    python -m server.benchmarks.indexes [--documents 20000] [--messages 200000]
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+from pymongo import MongoClient
+
+from server.utils.config import MONGO_URI, MONGO_DB_NAME
+from server.utils.db import REQUIRED_INDEXES, index_name
+from server.utils.chatHistory import NEWEST_FIRST
+
+INSERT_BATCH_SIZE = 5000
+
+
+def seed(db, documents: int, messages: int, users: int) -> dict:
+    now = datetime.utcnow()
+    user_ids = [str(uuid4()) for _ in range(users)]
+    pdfs = [{
+        "pdf_id": str(uuid4()),
+        "user_id": random.choice(user_ids),
+        "vector_id": str(uuid4()),
+        "job_id": str(uuid4()),
+        "content_hash": uuid4().hex,
+        "created_at": now - timedelta(minutes=n)
+    } for n in range(documents)]
+
+    for start in range(0, documents, INSERT_BATCH_SIZE):
+        batch = pdfs[start:start + INSERT_BATCH_SIZE]
+        db["pdfs"].insert_many([dict(pdf) for pdf in batch])
+        db["pdf_blobs"].insert_many([{"content_hash": pdf["content_hash"], "vector_id": pdf["vector_id"]}
+                                     for pdf in batch])
+        db["ingestion_jobs"].insert_many([{"job_id": pdf["job_id"], "pdf_id": pdf["vector_id"]} for pdf in batch])
+
+    for start in range(0, messages, INSERT_BATCH_SIZE):
+        db["chat_history"].insert_many([{
+            "pdf_id": random.choice(pdfs)["pdf_id"],
+            "role": "user",
+            "message": "x" * 64,
+            "timestamp": now - timedelta(seconds=n)
+        } for n in range(start, min(start + INSERT_BATCH_SIZE, messages))])
+
+    return random.choice(pdfs)
+
+
+def hot_queries(sample: dict) -> list:
+    # (label, collection, filter, sort, limit) mirroring what the routes run on every request
+    return [
+        ("pdfs by pdf_id + owner", "pdfs", {"pdf_id": sample["pdf_id"], "user_id": sample["user_id"]}, None, 1),
+        ("documents of a user", "pdfs", {"user_id": sample["user_id"]}, [("created_at", -1)], 0),
+        ("pdfs sharing a blob", "pdfs", {"vector_id": sample["vector_id"]}, None, 0),
+        ("blob by content hash", "pdf_blobs", {"content_hash": sample["content_hash"]}, None, 1),
+        ("recent chat window", "chat_history", {"pdf_id": sample["pdf_id"]}, NEWEST_FIRST, 20),
+        ("job status", "ingestion_jobs", {"job_id": sample["job_id"]}, None, 1),
+    ]
+
+
+def plan_stages(plan: dict) -> list:
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+def explain(db, collection: str, query: dict, sort, limit: int) -> dict:
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    if limit:
+        command["limit"] = limit
+
+    result = db.command("explain", command, verbosity="executionStats")
+    stages = plan_stages(result["queryPlanner"]["winningPlan"])
+    stats = result["executionStats"]
+    return {
+        "scan": "IXSCAN" if "IXSCAN" in stages else "COLLSCAN" if "COLLSCAN" in stages else stages[-1],
+        "docs_examined": stats["totalDocsExamined"],
+        "millis": stats["executionTimeMillis"]
+    }
+
+
+def create_required_indexes(db):
+    for collection_name, specs in REQUIRED_INDEXES.items():
+        for keys, options in specs:
+            db[collection_name].create_index(keys, name=index_name(keys), **options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain the hot Mongo queries without and with the required indexes.")
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--database", default=f"{MONGO_DB_NAME}_index_benchmark",
+                        help="scratch database, dropped before and after the run")
+    args = parser.parse_args()
+
+    client = MongoClient(MONGO_URI)
+    client.drop_database(args.database)
+    db = client[args.database]
+
+    try:
+        print(f"[INFO] Seeding {args.documents} documents and {args.messages} chat messages")
+        sample = seed(db, args.documents, args.messages, args.users)
+        queries = hot_queries(sample)
+
+        before = [explain(db, *query[1:]) for query in queries]
+        create_required_indexes(db)
+        after = [explain(db, *query[1:]) for query in queries]
+
+        print(f"{'query':<26}{'before':>28}{'after':>28}")
+        for (label, *_), old, new in zip(queries, before, after):
+            print(f"{label:<26}"
+                  f"{old['scan']:>9} {old['docs_examined']:>9} docs {old['millis']:>4}ms"
+                  f"{new['scan']:>9} {new['docs_examined']:>9} docs {new['millis']:>4}ms")
+    finally:
+        client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares PageAwareTextSplitter with langchain's RecursiveCharacterTextSplitter (what ingestion
+used before) on the pages of synthetic PDFs, with the same chunk size and overlap:
+    python -m server.benchmarks.splitter [--pages 100,1000] [--repeat 3]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from server.utils.pdfExtraction import iter_page_ranges
+from server.utils.textSplitter import PageAwareTextSplitter
+from server.benchmarks.syntheticPdf import synthetic_pdf_path
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+SPLITTERS = {
+    "RecursiveCharacter": lambda: RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP,
+                                                                 add_start_index=True),
+    "PageAware": lambda: PageAwareTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP),
+}
+
+
+def best_of(make_splitter, pages: list, repeat: int) -> tuple:
+    timings = []
+    chunks = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = make_splitter().split_documents(pages)
+        timings.append(time.perf_counter() - started)
+    return min(timings), len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare text splitter throughput on synthetic PDFs.")
+    parser.add_argument("--pages", default="100,1000", help="comma separated page counts")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="splitter_benchmark_")
+    try:
+        print(f"{'pages':>6}{'MB':>7}" + "".join(f"{name:>32}" for name in SPLITTERS))
+        for page_count in [int(n) for n in args.pages.split(",")]:
+            pages = list(iter_page_ranges(synthetic_pdf_path(directory, page_count)))
+            megabytes = sum(len(page.page_content) for page in pages) / 1024 / 1024
+
+            cells = []
+            for make_splitter in SPLITTERS.values():
+                seconds, chunks = best_of(make_splitter, pages, args.repeat)
+                cells.append(f"{seconds:.3f}s {megabytes / seconds:.1f}MB/s {chunks} chunks")
+            print(f"{page_count:>6}{megabytes:>7.1f}" + "".join(f"{cell:>32}" for cell in cells), flush=True)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
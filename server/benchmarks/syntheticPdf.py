@@ -0,0 +1,40 @@
+"""
+Synthetic PDFs for the benchmarks: pages of numbered paragraphs, so extraction and chunking
+see realistic text without shipping real papers.
+"""
+
+import os
+import random
+
+import fitz
+
+WORDS = ("model data training results method accuracy baseline dataset evaluation network layer "
+         "attention experiment performance analysis feature learning proposed approach significant").split()
+
+
+def synthetic_paragraph(rng: random.Random, sentences: int = 5) -> str:
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def write_synthetic_pdf(path: str, pages: int, paragraphs_per_page: int = 6, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    document = fitz.open()
+    for number in range(pages):
+        page = document.new_page()
+        text = f"Section {number + 1}\n\n" + "\n\n".join(
+            synthetic_paragraph(rng) for _ in range(paragraphs_per_page)
+        )
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=8)
+    document.save(path)
+    document.close()
+    return path
+
+
+def synthetic_pdf_path(directory: str, pages: int) -> str:
+    path = os.path.join(directory, f"synthetic_{pages}_pages.pdf")
+    if not os.path.exists(path):
+        write_synthetic_pdf(path, pages)
+    return path
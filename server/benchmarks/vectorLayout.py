@@ -0,0 +1,121 @@
+"""
+Compares the "per_pdf" and "shared" vector store layouts as the document count grows.
+
+For every document count, a scratch Chroma directory is filled with synthetic chunks (random
+vectors, so the embedding model stays out of the measurement) under each layout, using the
+collection names and search filters of PDFProcess. It then reports the write time, the time to
+open a document's store cold, the query latency and the size on disk:
+    python -m server.benchmarks.vectorLayout [--documents 1000,10000,50000] [--chunks 8]
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import chromadb
+
+from server.utils import PDFProcess
+from server.utils.documentCleanup import directory_size
+from server.benchmarks.syntheticPdf import synthetic_paragraph
+
+DIMENSIONS = 384
+QUERIES = 200
+WRITE_BATCH_SIZE = 2000
+
+
+def random_vector(rng: random.Random) -> list:
+    return [rng.uniform(-1, 1) for _ in range(DIMENSIONS)]
+
+
+def fill(client, documents: int, chunks: int, rng: random.Random) -> list:
+    pdf_ids = [f"bench{n:06d}" for n in range(documents)]
+    # collection name -> pending (ids, vectors, texts, metadatas)
+    pending = {}
+
+    def flush(name: str):
+        ids, vectors, texts, metadatas = pending.pop(name)
+        client.get_or_create_collection(name).upsert(ids=ids, embeddings=vectors, documents=texts,
+                                                     metadatas=metadatas)
+
+    for pdf_id in pdf_ids:
+        name = PDFProcess.get_collection_name(pdf_id)
+        batch = pending.setdefault(name, ([], [], [], []))
+        for n in range(chunks):
+            batch[0].append(f"{pdf_id}_{n}")
+            batch[1].append(random_vector(rng))
+            batch[2].append(synthetic_paragraph(rng, sentences=3))
+            batch[3].append({"pdf_id": pdf_id, "page": n})
+        # Per-PDF collections are written per document, shard collections in large batches
+        if PDFProcess.VECTOR_STORE_LAYOUT != "shared" or len(batch[0]) >= WRITE_BATCH_SIZE:
+            flush(name)
+
+    for name in list(pending):
+        flush(name)
+    return pdf_ids
+
+
+def measure_queries(path: str, pdf_ids: list, rng: random.Random) -> dict:
+    # A fresh client, as a new worker would have, so opening the collection is part of the first query
+    client = chromadb.PersistentClient(path=path)
+    open_seconds = []
+    query_seconds = []
+
+    for pdf_id in rng.sample(pdf_ids, min(QUERIES, len(pdf_ids))):
+        started = time.perf_counter()
+        collection = client.get_collection(PDFProcess.get_collection_name(pdf_id))
+        opened = time.perf_counter()
+        collection.query(query_embeddings=[random_vector(rng)], n_results=4,
+                         where=PDFProcess.get_search_filter(pdf_id))
+        open_seconds.append(opened - started)
+        query_seconds.append(time.perf_counter() - opened)
+
+    query_seconds.sort()
+    return {
+        "open_ms": round(statistics.mean(open_seconds) * 1000, 2),
+        "query_ms": round(statistics.mean(query_seconds) * 1000, 2),
+        "query_p95_ms": round(query_seconds[int(len(query_seconds) * 0.95) - 1] * 1000, 2)
+    }
+
+
+def run(layout: str, documents: int, chunks: int, shards: int) -> dict:
+    PDFProcess.VECTOR_STORE_LAYOUT = layout
+    PDFProcess.VECTOR_STORE_SHARDS = shards
+    rng = random.Random(documents)
+    path = tempfile.mkdtemp(prefix=f"vector_layout_{layout}_")
+
+    try:
+        started = time.perf_counter()
+        pdf_ids = fill(chromadb.PersistentClient(path=path), documents, chunks, rng)
+        write_seconds = time.perf_counter() - started
+
+        return {
+            "layout": layout,
+            "documents": documents,
+            "write_s": round(write_seconds, 1),
+            **measure_queries(path, pdf_ids, rng),
+            "disk_mb": round(directory_size(path) / 1024 / 1024, 1)
+        }
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per_pdf and shared vector store layouts.")
+    parser.add_argument("--documents", default="1000,10000,50000", help="comma separated document counts")
+    parser.add_argument("--chunks", type=int, default=8, help="chunks per document")
+    parser.add_argument("--shards", type=int, default=1, help="shard collections in the shared layout")
+    args = parser.parse_args()
+
+    columns = ["layout", "documents", "write_s", "open_ms", "query_ms", "query_p95_ms", "disk_mb"]
+    print("".join(f"{column:>14}" for column in columns))
+    for documents in [int(n) for n in args.documents.split(",")]:
+        for layout in ("per_pdf", "shared"):
+            result = run(layout, documents, args.chunks, args.shards)
+            print("".join(f"{result[column]:>14}" for column in columns), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 from pydantic import BaseModel
 from typing import Optional, List
 
+class CoverageSchema(BaseModel):
+    indexed_pages: Optional[int] = None
+    total_pages: Optional[int] = None
+    # False while the document is still being embedded: the answer only used the indexed pages
+    complete: bool = True
+
+
 class AnswerSchema(BaseModel):
     answer: str
-    source_documents: List[str]
\ No newline at end of file
+    source_documents: List[str]
+    coverage: Optional[CoverageSchema] = None
\ No newline at end of file
@@ -0,0 +1,30 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Optional, Dict
+
+
+class UploadJobSchema(BaseModel):
+    pdf_id: str
+    # Identical uploads share the job of the first one
+    job_id: str
+    file_name: Optional[str] = "Unknown"
+    status: str = "processing"
+
+
+class JobStageSchema(BaseModel):
+    status: str
+    seconds: Optional[float] = None
+    # Pages (parse) or chunks (split/embed/store) per busy second of the stage
+    items_per_second: Optional[float] = None
+
+
+class JobStatusSchema(BaseModel):
+    job_id: str
+    pdf_id: str
+    status: str
+    stages: Dict[str, JobStageSchema]
+    # Wall-clock totals of the overlapping parse/split/embed/store stages
+    pipeline: Optional[Dict[str, Optional[float]]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
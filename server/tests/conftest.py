@@ -0,0 +1,5 @@
+import os
+
+# Clients built at import time (Gemini chains) only need a key to exist, not to be valid
+os.environ.setdefault("GEMINAI_API_KEY", "test-key")
+os.environ.setdefault("GEMINAI_MODEL", "gemini-1.5-flash")
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("langchain_chroma")
+pytest.importorskip("langchain_community")
+pytest.importorskip("langchain_google_genai")
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from server.utils import llm as llm_module
+from server.utils import QAScript
+
+LLM_SECONDS = 0.2
+EVAL_SECONDS = 0.2
+PARALLEL_CALLS = 10
+
+
+async def slow_generation(prompt_value):
+    await asyncio.sleep(LLM_SECONDS)
+    return AIMessage(content="A stub answer.")
+
+
+class SlowEvalChain:
+    async def ainvoke(self, inputs: dict):
+        await asyncio.sleep(EVAL_SECONDS)
+        return {"is_relevant": True, "is_faithful": True, "reasoning": "stub"}
+
+
+async def no_documents(question: str, pdf_id: str):
+    return []
+
+
+@pytest.fixture
+def slow_models(monkeypatch):
+    stub_llm = RunnableLambda(slow_generation)
+    monkeypatch.setattr(llm_module, "llm", stub_llm)
+    monkeypatch.setattr(llm_module, "get_llm", lambda temperature: stub_llm)
+    monkeypatch.setattr(llm_module, "aretrieve_documents", no_documents)
+    monkeypatch.setattr(QAScript, "eval_chain", SlowEvalChain())
+
+
+async def answer_in_parallel(calls: int) -> float:
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        llm_module.aget_answer_from_pdf(f"Question {n}?", f"pdf-{n}", [], profile={})
+        for n in range(calls)
+    ])
+    assert all(result["approved"] for result in results)
+    return time.perf_counter() - started
+
+
+@pytest.mark.parametrize("mode", ["sequential", "speculative"])
+def test_parallel_answers_take_about_as_long_as_one(slow_models, monkeypatch, mode):
+    monkeypatch.setattr(llm_module, "CHAT_GENERATION_MODE", mode)
+
+    single = asyncio.run(answer_in_parallel(1))
+    parallel = asyncio.run(answer_in_parallel(PARALLEL_CALLS))
+
+    # Serialised calls would take PARALLEL_CALLS times as long
+    assert single >= LLM_SECONDS + EVAL_SECONDS
+    assert parallel < single * 2
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("ddgs")
+pytest.importorskip("requests")
+
+from server.utils.externalContext import ContextProvider, ExternalContextFetcher
+
+TIMEOUT_SECONDS = 0.2
+
+
+class StubProvider(ContextProvider):
+    def __init__(self, name: str, delay: float = 0.0):
+        self.name = name
+        self.label = name.upper()
+        self.delay = delay
+        self.calls = 0
+        self.threads = []
+
+    def fetch(self, query: str) -> str:
+        self.calls += 1
+        self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay)
+        return f"{self.name} result for {query}"
+
+
+@pytest.fixture
+def make_fetcher():
+    fetchers = []
+
+    def make(providers: list) -> ExternalContextFetcher:
+        fetcher = ExternalContextFetcher(providers, timeout_seconds=TIMEOUT_SECONDS, ttl_seconds=60,
+                                         max_entries=8, workers=2)
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.shutdown()
+
+
+def test_slow_provider_yields_partial_result_within_deadline_and_is_not_cached(make_fetcher):
+    fast, slow = StubProvider("fast"), StubProvider("slow", delay=1.0)
+    fetcher = make_fetcher([fast, slow])
+
+    started = time.monotonic()
+    context = asyncio.run(fetcher.afetch("Photosynthesis"))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < TIMEOUT_SECONDS + 0.3
+    assert "--- FAST ---\nfast result for Photosynthesis" in context
+    assert "SLOW" not in context
+
+    # The partial result was not cached, so the next request asks every provider again
+    asyncio.run(fetcher.afetch("photosynthesis"))
+    assert fast.calls == 2
+    assert slow.calls == 2
+
+
+def test_complete_results_are_cached_per_normalized_query(make_fetcher):
+    first, second = StubProvider("first"), StubProvider("second")
+    fetcher = make_fetcher([first, second])
+
+    context = asyncio.run(fetcher.afetch("What is  Photosynthesis?"))
+    assert asyncio.run(fetcher.afetch("what is photosynthesis")) == context
+
+    assert first.calls == 1
+    assert second.calls == 1
+
+
+def test_providers_run_on_the_fetchers_own_pool(make_fetcher):
+    provider = StubProvider("stub")
+    asyncio.run(make_fetcher([provider]).afetch("query"))
+
+    assert provider.threads[0].startswith("external-context")
@@ -0,0 +1,58 @@
+import tracemalloc
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("langchain_core")
+
+from server.utils import pdfExtraction
+from server.utils.pdfExtraction import iter_page_ranges, extract_page_range
+
+PAGE_COUNT = 200
+PAGES_PER_RANGE = 10
+
+
+@pytest.fixture(scope="module")
+def synthetic_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdfs") / "synthetic.pdf"
+    document = fitz.open()
+    for number in range(PAGE_COUNT):
+        page = document.new_page()
+        text = "\n".join(f"Page {number} line {line}: " + "lorem ipsum dolor sit amet " * 3 for line in range(50))
+        page.insert_textbox(page.rect, text, fontsize=4)
+    document.save(str(path))
+    document.close()
+    return str(path)
+
+
+def peak_memory(func) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_in_process_extraction_yields_every_page_in_order(synthetic_pdf, monkeypatch):
+    monkeypatch.setattr(pdfExtraction, "EXTRACTION_PROCESSES", 1)
+
+    pages = list(iter_page_ranges(synthetic_pdf, PAGES_PER_RANGE))
+
+    assert [page.metadata["page"] for page in pages] == list(range(PAGE_COUNT))
+    assert all(page.metadata["total_pages"] == PAGE_COUNT for page in pages)
+    assert pages[7].page_content.startswith("Page 7 line 0")
+
+
+def test_in_process_extraction_memory_is_bounded_by_the_range(synthetic_pdf, monkeypatch):
+    monkeypatch.setattr(pdfExtraction, "EXTRACTION_PROCESSES", 1)
+
+    def consume_streaming():
+        for _ in iter_page_ranges(synthetic_pdf, PAGES_PER_RANGE):
+            pass
+
+    streaming_peak = peak_memory(consume_streaming)
+    whole_document_peak = peak_memory(lambda: extract_page_range(synthetic_pdf, 0, PAGE_COUNT))
+
+    # One range is a twentieth of the document; leave room for fitz and interpreter overhead
+    assert streaming_peak < whole_document_peak / 4
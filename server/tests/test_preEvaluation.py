@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+
+from server.utils import QAScript
+from server.utils.QAScript import pre_evaluate, local_verdict, content_words
+
+CONTEXT = (
+    "The proposed model reaches 95% accuracy on the benchmark. "
+    "Training takes 12 hours on a single GPU. "
+    "The method improves recall over the baseline."
+)
+
+
+def test_content_words_keep_negations_and_numbers():
+    words = content_words("No, it is not 42 and it isn't 3.5")
+    assert {"no", "not", "42", "3.5"} <= words
+
+
+def test_grounded_answer_is_accepted_locally():
+    answer = "The proposed model reaches 95% accuracy on the benchmark."
+    assert pre_evaluate("What accuracy does the model reach?", CONTEXT, answer) == 1.0
+
+
+def test_contradicting_number_reaches_llm_judge():
+    answer = "The proposed model reaches 42% accuracy on the benchmark."
+    assert pre_evaluate("What accuracy does the model reach?", CONTEXT, answer) == 0.0
+
+
+def test_contradicting_decimal_reaches_llm_judge():
+    answer = "Training takes 1.5 hours on a single GPU."
+    assert pre_evaluate("How long does training take?", CONTEXT, answer) == 0.0
+
+
+@pytest.mark.parametrize("answer", [
+    "The method does not improve recall over the baseline.",
+    "The method never improves recall over the baseline.",
+    "The method doesn't improve recall over the baseline.",
+    "No, the method improves recall over the baseline only on paper.",
+])
+def test_negated_answer_reaches_llm_judge(answer):
+    assert pre_evaluate("Does the method improve recall over the baseline?", CONTEXT, answer) == 0.0
+
+
+def test_negation_present_in_context_is_still_accepted():
+    context = "The method does not require labelled data."
+    answer = "The method does not require labelled data."
+    assert pre_evaluate("Does the method require labelled data?", context, answer) == 1.0
+
+
+def test_contradiction_is_not_approved_without_the_judge(monkeypatch):
+    monkeypatch.setattr(QAScript, "evaluator_stats", {"local_accepts": 0, "llm_evaluations": 0})
+    answer = "The proposed model reaches 42% accuracy on the benchmark."
+
+    assert local_verdict("What accuracy does the model reach?", CONTEXT, answer) is None
+    assert QAScript.evaluator_stats == {"local_accepts": 0, "llm_evaluations": 1}
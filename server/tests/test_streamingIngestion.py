@@ -0,0 +1,97 @@
+import asyncio
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("fastapi")
+pytest.importorskip("langchain_chroma")
+pytest.importorskip("langchain_google_genai")
+
+from langchain_core.messages import AIMessage
+
+from server.utils import llm, ingestionPipeline, pdfExtraction
+from server.utils.ingestionPipeline import IngestionPipeline, queue_size_for_budget
+from server.utils.llm import StreamingSummarizer
+from server.utils.PDFProcess import DocumentProfileBuilder, iter_pdf_pages
+from server.benchmarks.syntheticPdf import write_synthetic_pdf
+
+DIMENSIONS = 384
+MEMORY_BUDGET_BYTES = 4 * 1024 * 1024
+
+
+class StubEmbeddings:
+    def embed_documents(self, texts: list) -> list:
+        # Plain float lists, like the real model returns, so vectors in flight weigh what they do in production
+        return [[0.1] * DIMENSIONS for _ in texts]
+
+
+class StubCollection:
+    def __init__(self):
+        self.count = 0
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.count += len(ids)
+
+
+class StubVectorStore:
+    def __init__(self):
+        self._collection = StubCollection()
+
+
+class StubChain:
+    async def ainvoke(self, inputs: dict):
+        await asyncio.sleep(0)
+        return AIMessage(content="A short summary.")
+
+
+@pytest.fixture
+def stub_backends(monkeypatch):
+    monkeypatch.setattr(ingestionPipeline, "get_embeddings", StubEmbeddings)
+    monkeypatch.setattr(ingestionPipeline, "open_vector_store", lambda pdf_id: StubVectorStore())
+    for chain in ("single_pass_summary_chain", "section_summary_chain", "reduce_summary_chain"):
+        monkeypatch.setattr(llm, chain, StubChain())
+    # Extract in-process, so every allocation is visible to tracemalloc
+    monkeypatch.setattr(pdfExtraction, "EXTRACTION_PROCESSES", 1)
+
+
+async def ingest_streaming(file_path: str) -> dict:
+    loop = asyncio.get_running_loop()
+    profile_builder = DocumentProfileBuilder(file_path)
+    summarizer = StreamingSummarizer(loop)
+    pipeline = IngestionPipeline(
+        "streaming-test", keep_pages=False,
+        on_page=[profile_builder.add_page, summarizer.add_page],
+        queue_size=queue_size_for_budget(MEMORY_BUDGET_BYTES, batch_size=16, embed_workers=2),
+        batch_size=16, embed_workers=2
+    )
+
+    report = await loop.run_in_executor(None, pipeline.run, iter_pdf_pages(file_path))
+    assert await summarizer.afinish() == "A short summary."
+    assert profile_builder.build()["page_count"] == report["pages"]
+    return report
+
+
+def peak_memory_of_streaming_ingestion(file_path: str) -> tuple:
+    tracemalloc.start()
+    try:
+        report = asyncio.run(ingest_streaming(file_path))
+        return report, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_ingestion_peak_memory_is_flat_in_page_count(stub_backends, tmp_path):
+    small = write_synthetic_pdf(str(tmp_path / "small.pdf"), pages=100)
+    large = write_synthetic_pdf(str(tmp_path / "large.pdf"), pages=1000)
+    # Lazy imports and caches filled by the first run are not part of either measurement
+    asyncio.run(ingest_streaming(write_synthetic_pdf(str(tmp_path / "warm_up.pdf"), pages=10)))
+
+    small_report, small_peak = peak_memory_of_streaming_ingestion(small)
+    large_report, large_peak = peak_memory_of_streaming_ingestion(large)
+
+    assert small_report["pages"] == 100
+    assert large_report["pages"] == 1000
+    assert large_report["chunks"] > small_report["chunks"] * 9
+    # Ten times the pages (and text) must not mean ten times the memory
+    assert large_peak < small_peak * 1.5
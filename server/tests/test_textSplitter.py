@@ -0,0 +1,113 @@
+import bisect
+import random
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document
+
+from server.utils.textSplitter import PageAwareTextSplitter
+
+WORDS = ["alpha", "beta", "gamma\n", "delta\n\n", "epsilon", "zeta" * 12]
+
+
+def random_pages(rng: random.Random, count: int) -> list:
+    return [
+        Document(page_content="".join(rng.choice(WORDS) + " " for _ in range(rng.randint(0, 300))),
+                 metadata={"source": "test.pdf"})
+        for _ in range(count)
+    ]
+
+
+def join(pages: list) -> str:
+    return "\n".join(page.page_content for page in pages)
+
+
+def page_starts(pages: list) -> list:
+    starts = [0]
+    for page in pages[:-1]:
+        starts.append(starts[-1] + len(page.page_content) + 1)
+    return starts
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_page_by_page_equals_splitting_the_joined_text(seed):
+    rng = random.Random(seed)
+    pages = random_pages(rng, rng.randint(1, 12))
+    chunk_size = rng.choice([100, 300, 1000])
+    chunk_overlap = rng.choice([0, chunk_size // 5])
+
+    incremental = PageAwareTextSplitter(chunk_size, chunk_overlap).split_documents(pages)
+    whole = PageAwareTextSplitter(chunk_size, chunk_overlap).split_documents([Document(page_content=join(pages))])
+
+    assert [chunk.page_content for chunk in incremental] == [chunk.page_content for chunk in whole]
+    assert [(c.metadata["start_index"], c.metadata["end_index"]) for c in incremental] == \
+           [(c.metadata["start_index"], c.metadata["end_index"]) for c in whole]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_offsets_size_and_pages_of_every_chunk(seed):
+    rng = random.Random(seed)
+    pages = random_pages(rng, rng.randint(1, 12))
+    joined = join(pages)
+    starts = page_starts(pages)
+
+    chunks = PageAwareTextSplitter(chunk_size=200, chunk_overlap=40).split_documents(pages)
+
+    assert chunks or not joined.strip()
+    for chunk in chunks:
+        start, end = chunk.metadata["start_index"], chunk.metadata["end_index"]
+        assert joined[start:end] == chunk.page_content
+        assert len(chunk.page_content) <= 200
+        assert chunk.metadata["page"] == bisect.bisect_right(starts, start) - 1
+        assert chunk.metadata["page_end"] == bisect.bisect_right(starts, end - 1) - 1
+        assert chunk.metadata["source"] == "test.pdf"
+
+
+def test_unbroken_token_is_hard_cut_to_chunk_size():
+    token = "x" * 5000
+    chunks = PageAwareTextSplitter(chunk_size=1000, chunk_overlap=200).split_documents([Document(page_content=token)])
+
+    assert all(len(chunk.page_content) <= 1000 for chunk in chunks)
+    assert chunks[0].page_content == token[:1000]
+    assert chunks[-1].metadata["end_index"] == 5000
+
+
+def test_chunk_spanning_a_page_break_cites_both_pages():
+    pages = [Document(page_content="First page text " * 5), Document(page_content="second page text " * 5)]
+    chunks = PageAwareTextSplitter(chunk_size=1000, chunk_overlap=0).split_documents(pages)
+
+    assert len(chunks) == 1
+    assert chunks[0].metadata["page"] == 0
+    assert chunks[0].metadata["page_end"] == 1
+
+
+def test_pending_page_never_passes_a_page_a_later_chunk_starts_on():
+    rng = random.Random(7)
+    for _ in range(50):
+        pages = random_pages(rng, rng.randint(1, 10))
+        splitter = PageAwareTextSplitter(chunk_size=200, chunk_overlap=40)
+        batches, watermarks = [], []
+        for page in pages:
+            batches.append(splitter.add_page(page))
+            watermarks.append(splitter.pending_page)
+        batches.append(splitter.finish())
+        watermarks.append(splitter.pending_page)
+
+        for position, watermark in enumerate(watermarks):
+            later_pages = [page_index for batch in batches[position + 1:] for page_index, _ in batch]
+            assert all(page_index >= watermark for page_index in later_pages)
+        assert watermarks[-1] == len(pages)
+
+
+def test_format_page_citation():
+    pytest.importorskip("langchain_google_genai")
+    pytest.importorskip("langchain_chroma")
+    from server.utils.llm import format_page_citation
+
+    assert format_page_citation({"page": 0, "page_end": 0}) == "[p. 1] "
+    assert format_page_citation({"page": 2, "page_end": 4}) == "[pp. 3-5] "
+    # Chunks stored before page_end existed cover one page
+    assert format_page_citation({"page": 6}) == "[p. 7] "
+    assert format_page_citation({}) == ""
@@ -1,18 +1,32 @@
 import os
 import re
-import shutil
+import glob
+import hashlib
+import aiofiles
+import aiofiles.os
+import chromadb
 from uuid import uuid4
-from fastapi import UploadFile
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from fastapi import UploadFile, HTTPException
 # from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
-from server.utils.config import UPLOAD_DIR, VECTOR_DB_DIR, EMBEDDING_MODEL, GEMINAI_API_KEY
+from server.utils.config import (UPLOAD_DIR, VECTOR_DB_DIR, EMBEDDING_MODEL, GEMINAI_API_KEY, MAX_UPLOAD_BYTES,
+                                 VECTOR_CACHE_MAX_ENTRIES, VECTOR_CACHE_MAX_MB, VECTOR_CACHE_IDLE_SECONDS,
+                                 VECTOR_STORE_LAYOUT, VECTOR_STORE_SHARDS)
+from server.utils.embeddingRegistry import get_embedding_model
+from server.utils.pdfExtraction import iter_page_ranges
+from server.utils.vectorStoreCache import VectorStoreCache
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(VECTOR_DB_DIR, exist_ok=True)
 
+vector_store_cache = VectorStoreCache(
+    max_entries=VECTOR_CACHE_MAX_ENTRIES,
+    max_bytes=VECTOR_CACHE_MAX_MB * 1024 * 1024,
+    idle_seconds=VECTOR_CACHE_IDLE_SECONDS
+)
+
 
 def sanitize_filename(filename: str):
     filename = re.sub(r'[\\/*?:"<>|]', "", filename)
@@ -22,46 +36,166 @@ def sanitize_filename(filename: str):
 
 def get_embeddings():
     # return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, google_api_key=GEMINAI_API_KEY)
-    return HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
+    return get_embedding_model()
+
 
+async def save_pdf_file(file: UploadFile) -> tuple[str, str, str]:
+    """
+    Streams the upload to disk and returns (pdf_id, file_path, sha256 of the content).
+    The bytes go to a `.part` file that is renamed into place only once complete, so an aborted
+    or oversized upload never leaves a partial `{pdf_id}_*.pdf` behind.
+    """
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit")
 
-async def save_pdf_file(file: UploadFile) -> tuple[str, str]:
     pdf_id = str(uuid4())
     safe_filename = sanitize_filename(file.filename)
     file_path = os.path.join(UPLOAD_DIR, f"{pdf_id}_{safe_filename}")
+    temp_path = f"{file_path}.part"
 
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    hasher = hashlib.sha256()
+    size = 0
 
-    return pdf_id, file_path
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413,
+                                        detail=f"File exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit")
+                hasher.update(chunk)
+                await buffer.write(chunk)
 
+        await aiofiles.os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            await aiofiles.os.remove(temp_path)
+        raise
 
-def process_pdf_to_vector_db(file_path: str, pdf_id: str):
-    loader = PyMuPDFLoader(file_path)
-    docs = loader.load()
+    return pdf_id, file_path, hasher.hexdigest()
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    splits = text_splitter.split_documents(docs)
 
-    vector_store = Chroma.from_documents(
-        documents=splits,
-        embedding=get_embeddings(),
-        persist_directory=VECTOR_DB_DIR,
-        collection_name=f"collection_{pdf_id}"
-    )
+def load_pdf_pages(file_path: str) -> list:
+    return list(iter_pdf_pages(file_path))
+
 
-    return vector_store
+def iter_pdf_pages(file_path: str):
+    # One Document per page, in order; large files are extracted across the process pool
+    return iter_page_ranges(file_path)
+
+
+class DocumentProfileBuilder:
+    """
+    Builds a document profile page by page, so streaming ingestion never holds the pages.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.page_offsets = []
+        self.header_pages = []
+        self._offset = 0
+
+    def add_page(self, doc):
+        self.page_offsets.append(self._offset)
+        self._offset += len(doc.page_content) + 1
+        if len(self.header_pages) < 2:
+            self.header_pages.append(doc.page_content)
+
+    def build(self) -> dict:
+        return {
+            "file_path": self.file_path,
+            "page_count": len(self.page_offsets),
+            "page_offsets": list(self.page_offsets),
+            "header_text": "\n".join(self.header_pages)
+        }
+
+
+def build_document_profile(file_path: str, docs: list) -> dict:
+    """
+    Everything the chat path needs from the PDF itself, computed once at ingestion:
+    the header text (pages 1-2, in case the title sits behind a cover sheet), the page count
+    and the start offset of every page in the newline-joined document text.
+    """
+    builder = DocumentProfileBuilder(file_path)
+    for doc in docs:
+        builder.add_page(doc)
+    return builder.build()
+
+
+def load_document_profile(pdf_id: str):
+    """
+    Builds the profile from the uploaded file, for documents ingested before profiles existed.
+    """
+    files = glob.glob(os.path.join(UPLOAD_DIR, f"{pdf_id}_*.pdf"))
+    if not files:
+        print(f"Error: No file found for ID {pdf_id} in {UPLOAD_DIR}")
+        return None
+
+    return build_document_profile(files[0], load_pdf_pages(files[0]))
+
+
+def get_collection_name(pdf_id: str) -> str:
+    if VECTOR_STORE_LAYOUT == "shared":
+        # Stable shard assignment so a document's chunks always live in the same collection
+        shard = int(hashlib.sha1(pdf_id.encode()).hexdigest(), 16) % VECTOR_STORE_SHARDS
+        return f"shared_{shard}"
+    return f"collection_{pdf_id}"
+
+
+def get_search_filter(pdf_id: str):
+    """
+    Metadata filter that scopes retrieval to one document in the shared layout.
+    """
+    if VECTOR_STORE_LAYOUT == "shared":
+        return {"pdf_id": pdf_id}
+    return None
 
 
 def get_vector_store(pdf_id: str):
     """
-    Retrieves the existing vector store for a specific PDF.
+    Retrieves the existing vector store for a specific PDF (cached per worker).
+    In the shared layout the handle is the shard collection; pair it with get_search_filter.
     """
+    return vector_store_cache.get_or_open(get_collection_name(pdf_id), lambda: open_vector_store(pdf_id))
+
+
+def open_vector_store(pdf_id: str):
+    # Uncached handle (creates the collection if needed), for writers
     return Chroma(
         persist_directory=VECTOR_DB_DIR,
         embedding_function=get_embeddings(),
-        collection_name=f"collection_{pdf_id}"
+        collection_name=get_collection_name(pdf_id)
     )
+
+
+def invalidate_vector_store(pdf_id: str):
+    # Shared shard handles stay valid when one document goes away
+    if VECTOR_STORE_LAYOUT != "shared":
+        vector_store_cache.invalidate(get_collection_name(pdf_id))
+
+
+def get_chroma_client():
+    return chromadb.PersistentClient(path=VECTOR_DB_DIR)
+
+
+def list_collection_names(client) -> list:
+    # Older chromadb returns Collection objects, newer versions plain names
+    return [c if isinstance(c, str) else c.name for c in client.list_collections()]
+
+
+def delete_vectors(pdf_id: str):
+    """
+    Removes every chunk of a document: the whole collection in the per-PDF layout,
+    or the document's slice of its shard in the shared layout.
+    """
+    invalidate_vector_store(pdf_id)
+    client = get_chroma_client()
+    collection_name = get_collection_name(pdf_id)
+
+    if collection_name not in list_collection_names(client):
+        return
+
+    if VECTOR_STORE_LAYOUT == "shared":
+        client.get_collection(collection_name).delete(where={"pdf_id": pdf_id})
+    else:
+        client.delete_collection(collection_name)
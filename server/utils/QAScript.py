@@ -1,15 +1,13 @@
+import re
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
-from server.utils.config import GEMINAI_MODEL, GEMINAI_API_KEY
+from server.utils.config import (GEMINAI_MODEL, GEMINAI_API_KEY, PRE_EVAL_ACCEPT_SCORE, PRE_EVAL_SENTENCE_OVERLAP,
+                                 PRE_EVAL_MIN_QUESTION_OVERLAP)
 from server.schemas.QASchema import QASchema
 
 
-def evaluate_response(question: str, context: str, answer: str):
-    """
-    Uses an LLM to grade the RAG system's output.
-    """
-
+def build_eval_chain():
     # Use a specific, strict model for evaluation (Temperature 0 is best for logic)
     eval_llm = ChatGoogleGenerativeAI(
         model=GEMINAI_MODEL,
@@ -45,10 +43,108 @@ def evaluate_response(question: str, context: str, answer: str):
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
 
-    chain = prompt | eval_llm | parser
+    return prompt | eval_llm | parser
+
+
+# Built once per worker and reused by every evaluation
+eval_chain = build_eval_chain()
+
+# Decimals stay one token, so "3.5" is not mistaken for "3" and "5"
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+STOPWORDS = {
+    "the", "and", "for", "are", "was", "were", "with", "that", "this", "these", "those", "from", "into",
+    "its", "their", "they", "them", "has", "have", "had", "which", "what", "when", "where", "who", "how",
+    "why", "can", "also", "such", "than", "then", "there", "been", "being", "but", "all", "any",
+    "our", "your", "you", "about", "between", "both", "each", "more", "most", "other", "some", "used",
+    "using", "use", "does", "did", "will", "would", "could", "should", "may", "might", "paper", "document"
+}
+# Flip or qualify a claim while sharing all its other words with the context
+NEGATIONS = {"no", "not", "never", "none", "nor", "neither", "nothing", "cannot", "without"}
+REFUSAL_MARKERS = ("cannot find", "can't find", "not mentioned", "not provided", "no information")
+
+evaluator_stats = {"local_accepts": 0, "llm_evaluations": 0}
+
+
+def is_critical_word(word: str) -> bool:
+    return word in NEGATIONS or any(c.isdigit() for c in word)
+
+
+def content_words(text: str) -> set:
+    # "isn't" -> "is not", so contractions count as negations
+    words = WORD_PATTERN.findall(text.lower().replace("n't", " not"))
+    # Crude plural/3rd-person folding so "achieves" matches "achieve"
+    return {
+        w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") and w.isalpha() else w
+        for w in words if is_critical_word(w) or (len(w) > 2 and w not in STOPWORDS)
+    }
+
+
+def pre_evaluate(question: str, context: str, answer: str) -> float:
+    """
+    Millisecond lexical grounding score in [0, 1]: the share of answer sentences whose content
+    words are (almost) all present in the retrieved context. Returns 0 when the answer does
+    not look related to the question, is a refusal, or uses a number or negation the context
+    does not contain (e.g. "42%" vs "95%", "does not improve" vs "improves"), so those always
+    reach the LLM judge.
+    """
+    if any(marker in answer.lower() for marker in REFUSAL_MARKERS):
+        return 0.0
+
+    question_words = content_words(question)
+    answer_words = content_words(answer)
+    if question_words and len(question_words & answer_words) / len(question_words) < PRE_EVAL_MIN_QUESTION_OVERLAP:
+        return 0.0
+
+    context_words = content_words(context)
+    if any(is_critical_word(w) and w not in context_words for w in answer_words):
+        return 0.0
+
+    sentences = [words for words in (content_words(s) for s in SENTENCE_PATTERN.split(answer)) if words]
+    if not sentences:
+        return 0.0
+
+    grounded = sum(
+        1 for words in sentences
+        if len(words & context_words) / len(words) >= PRE_EVAL_SENTENCE_OVERLAP
+    )
+    return grounded / len(sentences)
+
+
+def local_verdict(question: str, context: str, answer: str):
+    score = pre_evaluate(question, context, answer)
+    if score < PRE_EVAL_ACCEPT_SCORE:
+        evaluator_stats["llm_evaluations"] += 1
+        return None
+
+    evaluator_stats["local_accepts"] += 1
+    return {
+        "is_relevant": True,
+        "is_faithful": True,
+        "reasoning": f"Accepted by local grounding check (score {score:.2f}).",
+        "score": score
+    }
+
+
+def get_evaluator_stats() -> dict:
+    total = evaluator_stats["local_accepts"] + evaluator_stats["llm_evaluations"]
+    return {
+        **evaluator_stats,
+        "llm_skip_rate": round(evaluator_stats["local_accepts"] / total, 4) if total else 0.0
+    }
+
+
+async def aevaluate_response(question: str, context: str, answer: str):
+    """
+    Grades the RAG system's output: clearly grounded answers are accepted locally,
+    everything else is escalated to the LLM judge.
+    """
+    verdict = local_verdict(question, context, answer)
+    if verdict:
+        return verdict
 
     try:
-        score = chain.invoke({
+        score = await eval_chain.ainvoke({
             "question": question,
             "context": context,
             "answer": answer
@@ -0,0 +1,95 @@
+import time
+from collections import OrderedDict
+from itertools import count
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from server.utils.config import ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES
+from server.utils.embeddingRegistry import get_embedding_model
+
+
+class AnswerCache:
+    """
+    Per-worker cache of evaluator-approved answers, keyed by pdf_id and question embedding.
+    A new question hits when its cosine similarity to a stored question of the same document
+    reaches `similarity`. Entries expire after `ttl_seconds` and the least recently used ones
+    are dropped beyond `max_entries`. Only touched from the event loop, so no locking.
+    """
+
+    def __init__(self, similarity: float, ttl_seconds: int, max_entries: int):
+        self.similarity = similarity
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (pdf_id, unit vector, result, expires_at)
+        self._by_pdf = {}  # pdf_id -> set of keys
+        self._keys = count()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, pdf_id: str, embedding: list):
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        best_key, best_score = None, self.similarity
+
+        for key in list(self._by_pdf.get(pdf_id, ())):
+            _, vector, _, expires_at = self._entries[key]
+            if expires_at < now:
+                self._remove(key)
+                continue
+            score = float(np.dot(query, vector))
+            if score >= best_score:
+                best_key, best_score = key, score
+
+        if best_key is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key][2]
+
+    def store(self, pdf_id: str, embedding: list, result: dict):
+        key = next(self._keys)
+        self._entries[key] = (pdf_id, self._normalize(embedding), result, time.monotonic() + self.ttl_seconds)
+        self._by_pdf.setdefault(pdf_id, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, pdf_id: str):
+        for key in list(self._by_pdf.get(pdf_id, ())):
+            self._remove(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _remove(self, key):
+        pdf_id = self._entries.pop(key)[0]
+        keys = self._by_pdf.get(pdf_id)
+        keys.discard(key)
+        if not keys:
+            del self._by_pdf[pdf_id]
+
+    @staticmethod
+    def _normalize(embedding: list):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+answer_cache = AnswerCache(
+    similarity=ANSWER_CACHE_SIMILARITY,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES
+)
+
+
+async def embed_question(question: str) -> list:
+    return await run_in_threadpool(get_embedding_model().embed_query, question)
@@ -1,3 +1,7 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -5,11 +9,43 @@ from unstructured_client.models.errors import Detail
 
 from server.utils.db import db_instance
 from server.utils.security import verify_password
-from server.utils.config import JWT_SECRET_KEY, JWT_ALGORITHM
+from server.utils.config import (JWT_SECRET_KEY, JWT_ALGORITHM, AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES,
+                                 AUTH_REVOCATION_POLL_SECONDS)
 from bson import ObjectId
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# token -> (user, jti, expires_at on the monotonic clock)
+_principal_cache = OrderedDict()
+# Revoked token ids -> JWT expiry (epoch seconds); entries are pruned once the token would have expired anyway
+_revoked_jtis = {}
+_revocation_sync = {"task": None, "last_seen": None}
+
+
+def _revoked_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token has been revoked (Logged out)",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _cache_principal(token: str, user: dict, jti: str, exp: float):
+    ttl = min(AUTH_CACHE_TTL_SECONDS, exp - time.time()) if exp else AUTH_CACHE_TTL_SECONDS
+    _principal_cache[token] = (user, jti, time.monotonic() + ttl)
+    _principal_cache.move_to_end(token)
+    while len(_principal_cache) > AUTH_CACHE_MAX_ENTRIES:
+        _principal_cache.popitem(last=False)
+
+
+def invalidate_user(user_id: str):
+    """
+    Drops cached principals of a user on this worker (after profile updates or account deletion).
+    Other workers pick the change up within AUTH_CACHE_TTL_SECONDS.
+    """
+    for token in [t for t, entry in _principal_cache.items() if entry[0]["_id"] == user_id]:
+        del _principal_cache[token]
+
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_expectation = HTTPException(
@@ -18,15 +54,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    is_blacklisted = await db_instance.db["token_blacklist"].find_one({
-        "token": token
-    })
-    if is_blacklisted:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has been revoked (Logged out)",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # Hot path: already validated on this worker and not revoked since
+    cached = _principal_cache.get(token)
+    if cached and cached[2] > time.monotonic():
+        if cached[1] in _revoked_jtis:
+            del _principal_cache[token]
+            raise _revoked_exception()
+        return dict(cached[0])
 
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
@@ -36,10 +70,96 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_expectation
 
+    jti = payload.get("jti")
+    if jti:
+        if jti in _revoked_jtis:
+            raise _revoked_exception()
+    else:
+        # Tokens issued before token ids existed can only be checked against Mongo
+        is_blacklisted = await db_instance.db["token_blacklist"].find_one({
+            "token": token
+        })
+        if is_blacklisted:
+            raise _revoked_exception()
+
     user = await db_instance.db["users"].find_one({"_id": ObjectId(user_id)})
 
     if user is None:
         raise credentials_expectation
 
     user["_id"] = str(user["_id"])
-    return user
+    if jti:
+        _cache_principal(token, user, jti, payload.get("exp"))
+    return dict(user)
+
+
+async def revoke_token(token: str):
+    """
+    Blacklists a token: effective immediately on this worker, and on the others after
+    their next revocation poll (at most AUTH_REVOCATION_POLL_SECONDS).
+    """
+    _principal_cache.pop(token, None)
+
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        payload = {}
+
+    jti = payload.get("jti")
+    exp = payload.get("exp")
+    if jti:
+        _revoked_jtis[jti] = exp or time.time() + AUTH_CACHE_TTL_SECONDS
+
+    existing = await db_instance.db["token_blacklist"].find_one({"token": token})
+    if not existing:
+        await db_instance.db["token_blacklist"].insert_one({
+            "token": token,
+            "jti": jti,
+            "expires_at": datetime.utcfromtimestamp(exp) if exp else None,
+            "blacklisted_at": datetime.utcnow(),
+        })
+
+
+async def sync_revocations():
+    """
+    Pulls token ids blacklisted (by any API instance) since the last poll into the local set.
+    """
+    query = {"jti": {"$ne": None}}
+    if _revocation_sync["last_seen"]:
+        # Overlap the window a little so inserts racing the previous poll are not missed
+        overlap = timedelta(seconds=AUTH_REVOCATION_POLL_SECONDS)
+        query["blacklisted_at"] = {"$gt": _revocation_sync["last_seen"] - overlap}
+    else:
+        # First sync: only tokens that have not expired yet matter
+        query["expires_at"] = {"$gt": datetime.utcnow()}
+
+    cursor = db_instance.db["token_blacklist"].find(query, {"jti": 1, "expires_at": 1, "blacklisted_at": 1})
+
+    async for entry in cursor:
+        expires_at = entry.get("expires_at")
+        _revoked_jtis[entry["jti"]] = (expires_at - datetime(1970, 1, 1)).total_seconds() if expires_at \
+            else time.time() + AUTH_CACHE_TTL_SECONDS
+        if not _revocation_sync["last_seen"] or entry["blacklisted_at"] > _revocation_sync["last_seen"]:
+            _revocation_sync["last_seen"] = entry["blacklisted_at"]
+
+    now = time.time()
+    for jti in [j for j, exp in _revoked_jtis.items() if exp < now]:
+        del _revoked_jtis[jti]
+
+
+async def _revocation_sync_loop():
+    while True:
+        try:
+            await sync_revocations()
+        except Exception as e:
+            print(f"[ERROR] Syncing token revocations: {e}")
+        await asyncio.sleep(AUTH_REVOCATION_POLL_SECONDS)
+
+
+def start_revocation_sync():
+    _revocation_sync["task"] = asyncio.create_task(_revocation_sync_loop())
+
+
+def stop_revocation_sync():
+    if _revocation_sync["task"]:
+        _revocation_sync["task"].cancel()
@@ -1,12 +1,47 @@
 from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
 from server.utils.db import db_instance
-from server.utils.security import encrypt_message, decrypt_message
+from server.utils.security import aencrypt_message, adecrypt_messages
+from server.utils.config import HISTORY_MAX_TURNS, HISTORY_TOKEN_BUDGET, COMPACTION_MIN_NEW_TURNS
+
+# Newest first; ties on timestamp (same millisecond) are broken by _id
+NEWEST_FIRST = [("timestamp", -1), ("_id", -1)]
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text, plus a little for the role prefix
+    return len(text) // 4 + 4
+
+
+def encode_history_cursor(doc: dict) -> str:
+    return f"{doc['timestamp'].isoformat()}|{doc['_id']}"
+
+
+def decode_history_cursor(cursor: str, older: bool = True, inclusive: bool = False) -> dict:
+    """
+    Turns a cursor back into a query matching only messages older (or newer) than it,
+    optionally including the cursor message itself. Raises ValueError on malformed cursors.
+    """
+    timestamp, object_id = cursor.split("|")
+    timestamp = datetime.fromisoformat(timestamp)
+    try:
+        object_id = ObjectId(object_id)
+    except InvalidId as e:
+        # InvalidId is not a ValueError; callers only need to handle one error type
+        raise ValueError(str(e)) from e
+
+    op = "$lt" if older else "$gt"
+    return {"$or": [
+        {"timestamp": {op: timestamp}},
+        {"timestamp": timestamp, "_id": {op + ("e" if inclusive else ""): object_id}}
+    ]}
 
 
 async def save_chat_message(pdf_id: str, role: str, message: str, sources: str = "user question"):
     collection = db_instance.db["chat_history"]
 
-    encrypted_message = encrypt_message(message)
+    encrypted_message = await aencrypt_message(message)
     await collection.insert_one({
         "pdf_id": pdf_id,
         "role": role,
@@ -16,18 +51,99 @@ async def save_chat_message(pdf_id: str, role: str, message: str, sources: str =
     })
 
 
-async def get_chat_history(pdf_id: str):
+def window_length(messages: list, token_budget: int) -> int:
+    """
+    How many of the newest-first `messages` fit `token_budget` (always at least one).
+    """
+    used_tokens = 0
+    for count, message in enumerate(messages):
+        used_tokens += estimate_tokens(message)
+        if count and used_tokens > token_budget:
+            return count
+    return len(messages)
+
+
+async def get_recent_chat_history(pdf_id: str, max_turns: int = HISTORY_MAX_TURNS,
+                                  token_budget: int = HISTORY_TOKEN_BUDGET):
+    """
+    The prompt window: the newest `max_turns` exchanges, trimmed further (oldest first) to fit
+    `token_budget`. Only those newest messages are fetched and decrypted (in one batch).
+    """
     collection = db_instance.db["chat_history"]
-    chat_history = []
-    async for doc in collection.find({"pdf_id": pdf_id}):
-        chat_history.append({
-            "role": doc["role"],
-            "message": decrypt_message(doc["message"]),
-            "sources": doc["sources"],
-        })
+    max_messages = max_turns * 2
+    docs = await collection.find({"pdf_id": pdf_id}).sort(NEWEST_FIRST).limit(max_messages).to_list(max_messages)
+
+    messages = await adecrypt_messages([doc["message"] for doc in docs])
+    count = window_length(messages, token_budget)
+    chat_history = [{
+        "role": doc["role"],
+        "message": message,
+        "sources": doc["sources"],
+    } for doc, message in zip(docs[:count], messages[:count])]
+
+    chat_history.reverse()
     return chat_history
 
 
+async def get_uncompacted_chat_history(pdf_id: str, covered_until: str = None,
+                                       max_turns: int = HISTORY_MAX_TURNS,
+                                       token_budget: int = HISTORY_TOKEN_BUDGET,
+                                       max_pending: int = COMPACTION_MIN_NEW_TURNS * 4):
+    """
+    Every message newer than `covered_until` (the rolling summary's cursor), in chronological order:
+    the same window as get_recent_chat_history, preceded by the messages that already left it but
+    wait for the next compaction. Compaction runs once COMPACTION_MIN_NEW_TURNS exchanges have
+    piled up, so there are only a few; `max_pending` caps them should compaction keep failing.
+    """
+    collection = db_instance.db["chat_history"]
+    query = {"pdf_id": pdf_id}
+    if covered_until:
+        query.update(decode_history_cursor(covered_until, older=False))
+
+    # One query for window and pending messages, so a message saved meanwhile cannot shift the boundary
+    limit = max_turns * 2 + max_pending
+    docs = await collection.find(query).sort(NEWEST_FIRST).limit(limit).to_list(limit)
+
+    messages = await adecrypt_messages([doc["message"] for doc in docs])
+    count = window_length(messages[:max_turns * 2], token_budget) + max_pending
+    chat_history = [{
+        "role": doc["role"],
+        "message": message,
+        "sources": doc["sources"],
+    } for doc, message in zip(docs[:count], messages[:count])]
+
+    chat_history.reverse()
+    return chat_history
+
+
+async def get_chat_history_page(pdf_id: str, limit: int, cursor: str = None):
+    """
+    One page of history in chronological order, ending just before `cursor` (or at the newest
+    message). Returns (messages, next_cursor); next_cursor is None on the oldest page.
+    """
+    collection = db_instance.db["chat_history"]
+    query = {"pdf_id": pdf_id}
+    if cursor:
+        query.update(decode_history_cursor(cursor))
+
+    # Fetch one extra message to know whether an older page exists
+    docs = await collection.find(query).sort(NEWEST_FIRST).limit(limit + 1).to_list(limit + 1)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    docs.reverse()
+    messages = await adecrypt_messages([doc["message"] for doc in docs])
+    chat_history = [{
+        "role": doc["role"],
+        "message": message,
+        "sources": doc["sources"],
+    } for doc, message in zip(docs, messages)]
+
+    next_cursor = encode_history_cursor(docs[0]) if has_more else None
+    return chat_history, next_cursor
+
+
 async def clear_chat_history(pdf_id: str):
     collection = db_instance.db["chat_history"]
     await collection.delete_many({"pdf_id": pdf_id})
+    await db_instance.db["chat_summaries"].delete_one({"pdf_id": pdf_id})
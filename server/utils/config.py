@@ -10,11 +10,96 @@ DOTENV_PATH = DOTENV_PATH
 VECTOR_DB_DIR = "data/vector_db"
 UPLOAD_DIR = "data/uploads"
 
+# Uploads larger than this are rejected while streaming (keep in line with nginx client_max_body_size)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024
+
 # Gemini AI configuration
 GEMINAI_API_KEY = os.getenv("GEMINAI_API_KEY")
 GEMINAI_MODEL = os.getenv("GEMINAI_MODEL")
 EMBEDDING_MODEL = "models/embedding-001"
 
+# Local HuggingFace embedding models (comma separated, the first one is the default)
+HF_EMBEDDING_MODELS = [
+    name.strip() for name in os.getenv("HF_EMBEDDING_MODELS", "BAAI/bge-small-en-v1.5").split(",") if name.strip()
+]
+HF_EMBEDDING_MODEL = HF_EMBEDDING_MODELS[0]
+
+# Background ingestion (parse -> split -> embed -> summarize) worker pool size
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+# Running jobs refresh their updated_at every heartbeat; a queued/running job silent for longer than
+# INGESTION_STALE_SECONDS lost its worker (restart, redeploy) and is requeued or marked failed
+INGESTION_HEARTBEAT_SECONDS = int(os.getenv("INGESTION_HEARTBEAT_SECONDS", "30"))
+INGESTION_STALE_SECONDS = int(os.getenv("INGESTION_STALE_SECONDS", "300"))
+
+# PDF text extraction: worker processes and pages per range handed to one worker
+# (documents with at most one range are extracted in-process)
+EXTRACTION_PROCESSES = int(os.getenv("EXTRACTION_PROCESSES", str(min(4, os.cpu_count() or 1))))
+EXTRACTION_PAGES_PER_RANGE = int(os.getenv("EXTRACTION_PAGES_PER_RANGE", "50"))
+
+# Staged ingestion pipeline: chunks per embedding batch, parallel embedding threads
+# and how many items may wait between two stages
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8"))
+# "buffered" keeps every parsed page in memory until the summary is written; "streaming" holds only
+# what is in flight, sized to fit INGESTION_MEMORY_BUDGET_MB; "auto" streams documents with more
+# than INGESTION_STREAMING_MIN_PAGES pages
+INGESTION_MODE = os.getenv("INGESTION_MODE", "auto")
+INGESTION_STREAMING_MIN_PAGES = int(os.getenv("INGESTION_STREAMING_MIN_PAGES", "200"))
+INGESTION_MEMORY_BUDGET_MB = int(os.getenv("INGESTION_MEMORY_BUDGET_MB", "64"))
+# Publish the "indexed up to page N" watermark every this many pages, so large documents
+# become queryable while the rest is still being embedded
+PROGRESSIVE_INDEX_PAGES = int(os.getenv("PROGRESSIVE_INDEX_PAGES", "20"))
+
+# Vector store layout: "per_pdf" (one Chroma collection per document) or "shared"
+# (VECTOR_STORE_SHARDS collections, chunks tagged with pdf_id/user_id and filtered at query time)
+VECTOR_STORE_LAYOUT = os.getenv("VECTOR_STORE_LAYOUT", "per_pdf")
+VECTOR_STORE_SHARDS = int(os.getenv("VECTOR_STORE_SHARDS", "1"))
+
+# Orphan garbage collection across Mongo, Chroma and the upload directory (interval 0 disables it);
+# files younger than the grace period may belong to an upload that is still being registered
+GC_INTERVAL_SECONDS = int(os.getenv("GC_INTERVAL_SECONDS", "21600"))
+GC_GRACE_SECONDS = int(os.getenv("GC_GRACE_SECONDS", "3600"))
+
+# Per-worker LRU of open Chroma collections
+VECTOR_CACHE_MAX_ENTRIES = int(os.getenv("VECTOR_CACHE_MAX_ENTRIES", "64"))
+VECTOR_CACHE_MAX_MB = int(os.getenv("VECTOR_CACHE_MAX_MB", "512"))
+VECTOR_CACHE_IDLE_SECONDS = int(os.getenv("VECTOR_CACHE_IDLE_SECONDS", "1800"))
+
+# Semantic answer cache (per worker): cosine similarity threshold, TTL and size bound
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "86400"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+
+# Answer generation: "sequential" (generate -> evaluate -> retry) or "speculative"
+# (one concurrent candidate per temperature, first accepted one wins)
+CHAT_GENERATION_MODE = os.getenv("CHAT_GENERATION_MODE", "sequential")
+SPECULATIVE_TEMPERATURES = [float(t) for t in os.getenv("SPECULATIVE_TEMPERATURES", "0.3,0.6,0.9").split(",")]
+
+# Study-mode external context (Wikipedia + web search): per-source deadline and query cache
+EXTERNAL_CONTEXT_TIMEOUT_SECONDS = float(os.getenv("EXTERNAL_CONTEXT_TIMEOUT_SECONDS", "5"))
+EXTERNAL_CONTEXT_TTL_SECONDS = int(os.getenv("EXTERNAL_CONTEXT_TTL_SECONDS", "3600"))
+EXTERNAL_CONTEXT_CACHE_SIZE = int(os.getenv("EXTERNAL_CONTEXT_CACHE_SIZE", "512"))
+# Provider calls run on their own bounded pool: a hanging search keeps a thread busy past its
+# deadline, and must not take threads from the shared pool the request path uses
+EXTERNAL_CONTEXT_WORKERS = int(os.getenv("EXTERNAL_CONTEXT_WORKERS", "8"))
+
+# Local pre-evaluation gate: answers scoring at least PRE_EVAL_ACCEPT_SCORE skip the LLM judge
+PRE_EVAL_ACCEPT_SCORE = float(os.getenv("PRE_EVAL_ACCEPT_SCORE", "0.9"))
+PRE_EVAL_SENTENCE_OVERLAP = float(os.getenv("PRE_EVAL_SENTENCE_OVERLAP", "0.8"))
+PRE_EVAL_MIN_QUESTION_OVERLAP = float(os.getenv("PRE_EVAL_MIN_QUESTION_OVERLAP", "0.3"))
+
+# Summarization: documents longer than SUMMARY_SINGLE_PASS_CHARS are summarized section by section
+SUMMARY_SINGLE_PASS_CHARS = int(os.getenv("SUMMARY_SINGLE_PASS_CHARS", "60000"))
+SUMMARY_SECTION_CHARS = int(os.getenv("SUMMARY_SECTION_CHARS", "20000"))
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+
+# Chat history sent to the LLM: at most HISTORY_MAX_TURNS exchanges and ~HISTORY_TOKEN_BUDGET tokens
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "10"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+# Older turns are folded into a rolling summary once this many have accumulated outside the window
+COMPACTION_MIN_NEW_TURNS = int(os.getenv("COMPACTION_MIN_NEW_TURNS", "3"))
+
 # MongoDB configuration
 MONGO_URI = os.getenv("MONGO_URI")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME")
@@ -24,8 +109,15 @@ JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRATION_MINUTES = int(os.getenv("JWT_EXPIRATION_MINUTES", "60"))
 
+# Per-worker cache of validated principals; logout reaches the other instances within the poll interval
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_REVOCATION_POLL_SECONDS = int(os.getenv("AUTH_REVOCATION_POLL_SECONDS", "5"))
+
 # Encryption configuration
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+# Threads reserved for bcrypt/Fernet work
+CRYPTO_WORKERS = int(os.getenv("CRYPTO_WORKERS", "2"))
 
 # Email configuration
 MAIL_USERNAME = os.getenv("MAIL_USERNAME")
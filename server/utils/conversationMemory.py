@@ -0,0 +1,108 @@
+"""
+Rolling conversation memory.
+
+Turns that fall out of the recent history window are folded into one summary per pdf_id,
+stored encrypted in `chat_summaries` together with a cursor to the newest message it covers.
+The prompt then carries that summary plus every message it does not cover yet (the recent window
+and the few waiting for the next compaction), so its size stays flat no matter how long the
+conversation gets.
+"""
+
+from datetime import datetime
+from langchain_core.prompts import PromptTemplate
+
+from server.utils.db import db_instance
+from server.utils.security import aencrypt_message, adecrypt_message, adecrypt_messages
+from server.utils.chatHistory import (NEWEST_FIRST, encode_history_cursor, decode_history_cursor,
+                                      get_recent_chat_history, get_uncompacted_chat_history)
+from server.utils.config import COMPACTION_MIN_NEW_TURNS
+from server.utils.llm import llm
+
+# pdf_ids currently being compacted by this worker
+_compacting = set()
+
+
+async def get_prompt_history(pdf_id: str) -> list:
+    """
+    Rolling summary (as a "system" entry) if one exists, followed by every message it does not
+    cover yet. The summary is read first: a compaction finishing in between can then only make
+    a message appear twice, never drop it.
+    """
+    record = await db_instance.db["chat_summaries"].find_one({"pdf_id": pdf_id})
+    recent = await get_uncompacted_chat_history(pdf_id, record["covered_until"] if record else None)
+
+    if record:
+        summary = await adecrypt_message(record["summary"])
+        return [{"role": "system", "message": f"Summary of the earlier conversation: {summary}",
+                 "sources": []}] + recent
+    return recent
+
+
+async def compact_conversation(pdf_id: str):
+    """
+    Folds turns older than the recent window into the summary, but only once at least
+    COMPACTION_MIN_NEW_TURNS of them have accumulated since the last compaction.
+    """
+    if pdf_id in _compacting:
+        return
+    _compacting.add(pdf_id)
+
+    try:
+        history = db_instance.db["chat_history"]
+
+        # Newest message that is no longer part of the recent window. The window is trimmed to the
+        # token budget as well as to HISTORY_MAX_TURNS, so measure the one the prompt actually gets
+        window = await get_recent_chat_history(pdf_id)
+        cursor = history.find({"pdf_id": pdf_id}).sort(NEWEST_FIRST).skip(len(window)).limit(1)
+        boundary = await cursor.to_list(1)
+        if not boundary:
+            return
+        boundary = boundary[0]
+
+        record = await db_instance.db["chat_summaries"].find_one({"pdf_id": pdf_id})
+        query = {"$and": [
+            {"pdf_id": pdf_id},
+            decode_history_cursor(encode_history_cursor(boundary), older=True, inclusive=True)
+        ]}
+        if record:
+            query["$and"].append(decode_history_cursor(record["covered_until"], older=False))
+
+        if await history.count_documents(query) < COMPACTION_MIN_NEW_TURNS * 2:
+            return
+
+        docs = await history.find(query).sort([("timestamp", 1), ("_id", 1)]).to_list(None)
+        messages = await adecrypt_messages([doc["message"] for doc in docs])
+        transcript = "\n".join(f"{doc['role']}: {message}" for doc, message in zip(docs, messages))
+        previous_summary = await adecrypt_message(record["summary"]) if record else "(none)"
+
+        prompt = PromptTemplate(
+            template="""
+            You maintain the running memory of a conversation between a user and a research assistant
+            about one PDF document. Update the existing summary with the new messages.
+            Keep facts, questions the user asked, answers given, and anything the user may refer back to.
+
+            **IMPORTANT: Limit the summary to 300 words.**
+
+            Existing summary:
+            {summary}
+
+            New messages:
+            {transcript}
+            """,
+            input_variables=["summary", "transcript"]
+        )
+        result = await (prompt | llm).ainvoke({"summary": previous_summary, "transcript": transcript})
+
+        await db_instance.db["chat_summaries"].update_one(
+            {"pdf_id": pdf_id},
+            {"$set": {
+                "summary": await aencrypt_message(result.content),
+                "covered_until": encode_history_cursor(boundary),
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+    except Exception as e:
+        print(f"[ERROR] Compacting conversation {pdf_id}: {e}")
+    finally:
+        _compacting.discard(pdf_id)
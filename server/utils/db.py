@@ -1,7 +1,8 @@
 import os
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
 
-from server.utils.config import MONGO_URI, MONGO_DB_NAME
+from server.utils.config import MONGO_URI, MONGO_DB_NAME, JWT_EXPIRATION_MINUTES
 
 
 class MongoDB:
@@ -11,6 +12,83 @@ class MongoDB:
 
 db_instance = MongoDB()
 
+# Indexes the hot queries rely on: collection -> [(keys, options)]
+REQUIRED_INDEXES = {
+    "pdfs": [
+        ([("pdf_id", 1), ("user_id", 1)], {}),
+        ([("user_id", 1), ("created_at", -1)], {}),
+        ([("vector_id", 1)], {}),
+        ([("job_id", 1)], {}),
+    ],
+    "pdf_blobs": [
+        ([("content_hash", 1)], {"unique": True}),
+        ([("vector_id", 1)], {}),
+    ],
+    "chat_history": [
+        ([("pdf_id", 1), ("timestamp", -1), ("_id", -1)], {}),
+    ],
+    "chat_summaries": [
+        ([("pdf_id", 1)], {"unique": True}),
+    ],
+    "ingestion_jobs": [
+        ([("job_id", 1)], {"unique": True}),
+    ],
+    "token_blacklist": [
+        ([("token", 1)], {}),
+        # A blacklisted token is useless once it would have expired anyway
+        ([("blacklisted_at", 1)], {"expireAfterSeconds": JWT_EXPIRATION_MINUTES * 60}),
+    ],
+    "users": [
+        ([("email", 1)], {"unique": True}),
+    ],
+}
+
+
+def index_name(keys: list) -> str:
+    # Same naming scheme pymongo uses by default
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+async def ensure_indexes():
+    """
+    Idempotently creates the required indexes (and TTLs), then reports indexes that exist
+    in the database but are neither declared here nor used since the server last started.
+    Failures are logged and skipped: a missing index slows queries down but must not stop startup.
+    """
+    for collection_name, specs in REQUIRED_INDEXES.items():
+        collection = db_instance.db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except PyMongoError as e:
+            print(f"[ERROR] Could not list indexes of {collection_name}: {e}")
+            continue
+        declared = {"_id_"}
+
+        for keys, options in specs:
+            name = index_name(keys)
+            declared.add(name)
+
+            try:
+                if name in existing:
+                    ttl = options.get("expireAfterSeconds")
+                    if ttl is not None and existing[name].get("expireAfterSeconds") != ttl:
+                        await db_instance.db.command("collMod", collection_name,
+                                                     index={"name": name, "expireAfterSeconds": ttl})
+                        print(f"[INFO] Updated TTL of {collection_name}.{name} to {ttl}s")
+                    continue
+
+                await collection.create_index(keys, name=name, **options)
+                print(f"[INFO] Created missing index {collection_name}.{name}")
+            except PyMongoError as e:
+                print(f"[ERROR] Could not create or update index {collection_name}.{name}: {e}")
+
+        try:
+            async for stats in collection.aggregate([{"$indexStats": {}}]):
+                if stats["name"] not in declared and stats["accesses"]["ops"] == 0:
+                    print(f"[INFO] Unused, undeclared index {collection_name}.{stats['name']}")
+        except PyMongoError as e:
+            print(f"[ERROR] Could not read index stats for {collection_name}: {e}")
+
 
 async def connect_to_mongo():
     db_instance.client = AsyncIOMotorClient(
@@ -20,6 +98,12 @@ async def connect_to_mongo():
     db_instance.db = db_instance.client[MONGO_DB_NAME]
     print("[INFO] Connected to MongoDB")
 
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        # Startup (revocation sync, GC, warm-up) must go on even if index maintenance breaks
+        print(f"[ERROR] Ensuring MongoDB indexes: {e}")
+
 
 async def close_mongoconnection():
     if db_instance.client:
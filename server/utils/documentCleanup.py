@@ -0,0 +1,224 @@
+"""
+Cascading delete and orphan garbage collection.
+
+Deleting a document only removes its `pdfs` record on the request path; once the last record
+referencing a blob is gone, `cascade_delete_blob` drops the vectors, the uploaded file and the
+ingestion jobs in the background. `collect_garbage` periodically reconciles Mongo, Chroma and
+the upload directory to catch whatever a crash or an in-flight ingestion left behind.
+"""
+
+import asyncio
+import glob
+import os
+import sqlite3
+import time
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+
+from server.utils.config import UPLOAD_DIR, VECTOR_DB_DIR, GC_INTERVAL_SECONDS, GC_GRACE_SECONDS
+from server.utils.db import db_instance
+from server.utils.PDFProcess import get_chroma_client, list_collection_names, delete_vectors, invalidate_vector_store
+
+# Rows fetched per call when scanning shared shards for orphaned chunks
+SHARD_SCAN_PAGE_SIZE = 5000
+
+_gc_state = {"task": None, "last_report": None}
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def remove_upload_files(vector_id: str) -> int:
+    """
+    Deletes the uploaded file(s) of a blob, including a leftover `.part`. Returns the bytes freed.
+    """
+    freed = 0
+    for path in glob.glob(os.path.join(UPLOAD_DIR, f"{vector_id}_*")):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+async def cascade_delete_blob(vector_id: str):
+    """
+    Removes everything stored for a blob nobody references any more. Meant to run as a
+    background task after the delete response has been sent.
+    """
+    try:
+        await run_in_threadpool(delete_vectors, vector_id)
+        freed = await run_in_threadpool(remove_upload_files, vector_id)
+        await db_instance.db["ingestion_jobs"].delete_many({"pdf_id": vector_id})
+        print(f"[INFO] Deleted blob {vector_id} ({freed} bytes of uploads)")
+    except Exception as e:
+        # The next garbage collection pass picks up whatever is left
+        print(f"[ERROR] Cascading delete of {vector_id}: {e}")
+
+
+async def get_live_vector_ids() -> set:
+    pdfs = db_instance.db["pdfs"]
+    live = set(await pdfs.distinct("vector_id"))
+    # Records from before content addressing store their vectors under their own pdf_id
+    live.update(await pdfs.distinct("pdf_id", {"vector_id": {"$exists": False}}))
+    live.update(await db_instance.db["pdf_blobs"].distinct("vector_id"))
+    live.discard(None)
+    return live
+
+
+def collect_orphaned_uploads(live: set) -> int:
+    freed = 0
+    cutoff = time.time() - GC_GRACE_SECONDS
+
+    for entry in os.scandir(UPLOAD_DIR):
+        if not entry.is_file() or entry.stat().st_mtime > cutoff:
+            continue
+        vector_id = entry.name.split("_", 1)[0]
+        if vector_id in live and not entry.name.endswith(".part"):
+            continue
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            freed += size
+        except FileNotFoundError:
+            pass
+
+    return freed
+
+
+def find_orphaned_vectors(live: set) -> list:
+    """
+    Lists (collection name, vector_id) pairs for per-PDF collections and shared-shard chunks
+    whose document no longer exists.
+    """
+    client = get_chroma_client()
+    orphans = []
+
+    for name in list_collection_names(client):
+        if name.startswith("collection_"):
+            vector_id = name[len("collection_"):]
+            if vector_id not in live:
+                orphans.append((name, vector_id))
+
+        elif name.startswith("shared_"):
+            collection = client.get_collection(name)
+            shard_orphans = set()
+            offset = 0
+            while True:
+                page = collection.get(include=["metadatas"], limit=SHARD_SCAN_PAGE_SIZE, offset=offset)
+                if not page["ids"]:
+                    break
+                shard_orphans.update(m.get("pdf_id") for m in page["metadatas"] if m)
+                offset += len(page["ids"])
+
+            orphans.extend((name, vector_id) for vector_id in shard_orphans - live if vector_id)
+
+    return orphans
+
+
+def delete_orphaned_vectors(orphans: list) -> int:
+    client = get_chroma_client()
+    for name, vector_id in orphans:
+        if name.startswith("collection_"):
+            invalidate_vector_store(vector_id)
+            client.delete_collection(name)
+        else:
+            client.get_collection(name).delete(where={"pdf_id": vector_id})
+    return len(orphans)
+
+
+def vacuum_vector_db() -> bool:
+    """
+    Compacts Chroma's SQLite file. Skipped (returns False) if another connection holds a lock.
+    """
+    path = os.path.join(VECTOR_DB_DIR, "chroma.sqlite3")
+    if not os.path.exists(path):
+        return False
+
+    try:
+        connection = sqlite3.connect(path, timeout=5)
+        try:
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+        return True
+    except sqlite3.OperationalError as e:
+        print(f"[ERROR] Vacuuming {path}: {e}")
+        return False
+
+
+async def collect_garbage() -> dict:
+    started = time.perf_counter()
+    vector_db_before = await run_in_threadpool(directory_size, VECTOR_DB_DIR)
+
+    live = await get_live_vector_ids()
+    uploads_freed = await run_in_threadpool(collect_orphaned_uploads, live)
+    orphans = await run_in_threadpool(find_orphaned_vectors, live)
+    # An upload registered while the shards were being scanned must not lose its fresh vectors
+    live = await get_live_vector_ids()
+    orphans = [(name, vector_id) for name, vector_id in orphans if vector_id not in live]
+    documents_removed = await run_in_threadpool(delete_orphaned_vectors, orphans)
+    vacuumed = await run_in_threadpool(vacuum_vector_db)
+
+    jobs = await db_instance.db["ingestion_jobs"].delete_many({
+        "pdf_id": {"$nin": list(live)},
+        "status": {"$in": ["done", "failed"]}
+    })
+
+    # History of documents whose record is gone (e.g. a crash between the two deletes)
+    # (read the chats first, so a document created in between is never considered stale)
+    chat_pdf_ids = set(await db_instance.db["chat_history"].distinct("pdf_id"))
+    chat_pdf_ids.update(await db_instance.db["chat_summaries"].distinct("pdf_id"))
+    stale_chats = chat_pdf_ids - set(await db_instance.db["pdfs"].distinct("pdf_id"))
+    if stale_chats:
+        await db_instance.db["chat_history"].delete_many({"pdf_id": {"$in": list(stale_chats)}})
+        await db_instance.db["chat_summaries"].delete_many({"pdf_id": {"$in": list(stale_chats)}})
+
+    vector_db_after = await run_in_threadpool(directory_size, VECTOR_DB_DIR)
+
+    report = {
+        "finished_at": datetime.utcnow().isoformat(),
+        "seconds": round(time.perf_counter() - started, 2),
+        "upload_bytes_reclaimed": uploads_freed,
+        "vector_db_bytes_reclaimed": max(vector_db_before - vector_db_after, 0),
+        "vector_documents_removed": documents_removed,
+        "ingestion_jobs_removed": jobs.deleted_count,
+        "chat_histories_removed": len(stale_chats),
+        "vacuumed": vacuumed
+    }
+    _gc_state["last_report"] = report
+    print(f"[INFO] Garbage collection: {report}")
+    return report
+
+
+def get_gc_report():
+    return _gc_state["last_report"]
+
+
+async def _garbage_collection_loop():
+    while True:
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+        try:
+            await collect_garbage()
+        except Exception as e:
+            print(f"[ERROR] Garbage collection: {e}")
+
+
+def start_garbage_collector():
+    if GC_INTERVAL_SECONDS > 0:
+        _gc_state["task"] = asyncio.create_task(_garbage_collection_loop())
+
+
+def stop_garbage_collector():
+    if _gc_state["task"]:
+        _gc_state["task"].cancel()
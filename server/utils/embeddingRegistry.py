@@ -0,0 +1,34 @@
+import threading
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from server.utils.config import HF_EMBEDDING_MODEL, HF_EMBEDDING_MODELS
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: str = HF_EMBEDDING_MODEL) -> HuggingFaceEmbeddings:
+    """
+    Returns the process-wide embedding model for `model_name`, loading it on first use.
+    The same instance is handed to every caller (sentence-transformers inference is thread-safe).
+    """
+    model = _registry.get(model_name)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        # Another thread may have loaded it while we waited for the lock
+        model = _registry.get(model_name)
+        if model is None:
+            model = HuggingFaceEmbeddings(model_name=model_name)
+            _registry[model_name] = model
+    return model
+
+
+def warm_up_embedding_models():
+    """
+    Loads every configured model and runs one dummy embedding so the first real
+    request does not pay for weight loading or lazy tokenizer initialisation.
+    """
+    for model_name in HF_EMBEDDING_MODELS:
+        get_embedding_model(model_name).embed_query("warm up")
+        print(f"[INFO] Embedding model loaded: {model_name}")
@@ -0,0 +1,148 @@
+import re
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from ddgs import DDGS
+
+from server.utils.config import (EXTERNAL_CONTEXT_TIMEOUT_SECONDS, EXTERNAL_CONTEXT_TTL_SECONDS,
+                                 EXTERNAL_CONTEXT_CACHE_SIZE, EXTERNAL_CONTEXT_WORKERS)
+
+
+class ContextProvider(ABC):
+    """
+    A source of study-mode background text. Subclasses implement the blocking `fetch`;
+    tests and benchmarks can plug in local stubs instead of network-backed providers.
+    """
+    name = "provider"
+    label = "EXTERNAL RESULTS"
+
+    @abstractmethod
+    def fetch(self, query: str) -> str:
+        ...
+
+
+class WikipediaProvider(ContextProvider):
+    """
+    Calls the MediaWiki API directly (same output as langchain's WikipediaQueryRun), because the
+    `wikipedia` client behind that tool sends its requests without a timeout.
+    """
+    name = "wikipedia"
+    label = "WIKIPEDIA RESULTS"
+    API_URL = "https://en.wikipedia.org/w/api.php"
+    HEADERS = {"User-Agent": "ResearchAssistantForPDFs/1.0"}
+
+    def __init__(self, timeout_seconds: float, top_k_results: int = 3, max_chars: int = 4000):
+        self.timeout_seconds = timeout_seconds
+        self.top_k_results = top_k_results
+        self.max_chars = max_chars
+
+    def _get(self, params: dict) -> dict:
+        response = requests.get(self.API_URL, params={**params, "action": "query", "format": "json"},
+                                headers=self.HEADERS, timeout=self.timeout_seconds)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch(self, query: str) -> str:
+        hits = self._get({"list": "search", "srsearch": query, "srlimit": self.top_k_results})
+        titles = [hit["title"] for hit in hits["query"]["search"]]
+        if not titles:
+            return "No good Wikipedia Search Result was found"
+
+        pages = self._get({"prop": "extracts", "exintro": 1, "explaintext": 1, "redirects": 1,
+                           "titles": "|".join(titles)})
+        extracts = {page["title"]: page.get("extract", "") for page in pages["query"]["pages"].values()}
+        summaries = [f"Page: {title}\nSummary: {extracts[title]}" for title in titles if extracts.get(title)]
+        return "\n\n".join(summaries)[:self.max_chars] or "No good Wikipedia Search Result was found"
+
+
+class DuckDuckGoProvider(ContextProvider):
+    name = "duckduckgo"
+    label = "INTERNET SEARCH RESULTS"
+
+    def __init__(self, timeout_seconds: float, max_results: int = 5):
+        self.timeout_seconds = timeout_seconds
+        self.max_results = max_results
+
+    def fetch(self, query: str) -> str:
+        # Same output as langchain's DuckDuckGoSearchRun, with the client timeout set
+        with DDGS(timeout=max(1, round(self.timeout_seconds))) as ddgs:
+            results = ddgs.text(query, max_results=self.max_results) or []
+        if not results:
+            return "No good DuckDuckGo Search Result was found"
+        return " ".join(result["body"] for result in results)
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", query.lower())).strip()
+
+
+class ExternalContextFetcher:
+    """
+    Queries every provider concurrently, each under its own deadline, and combines whatever
+    came back in time. Complete results are cached by normalized query for `ttl_seconds`.
+    """
+
+    def __init__(self, providers: list, timeout_seconds: float, ttl_seconds: int, max_entries: int,
+                 workers: int = EXTERNAL_CONTEXT_WORKERS):
+        self.providers = providers
+        self.timeout_seconds = timeout_seconds
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # normalized query -> (context, expires_at)
+        # A fetch that outlives its deadline only ties up a thread of this pool
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="external-context")
+
+    async def afetch(self, query: str) -> str:
+        key = normalize_query(query)
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            self._cache.move_to_end(key)
+            return cached[0]
+
+        results = await asyncio.gather(*[self._fetch_one(provider, query) for provider in self.providers])
+
+        external_context = "".join(
+            f"\n\n--- {provider.label} ---\n{result}"
+            for provider, result in zip(self.providers, results) if result is not None
+        )
+
+        # Partial results are served but not cached, so a slow provider gets another chance
+        if all(result is not None for result in results):
+            self._cache[key] = (external_context, time.monotonic() + self.ttl_seconds)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        return external_context
+
+    async def _fetch_one(self, provider: ContextProvider, query: str):
+        try:
+            loop = asyncio.get_running_loop()
+            return await asyncio.wait_for(loop.run_in_executor(self._executor, provider.fetch, query),
+                                          self.timeout_seconds)
+        except asyncio.TimeoutError:
+            print(f"[ERROR] {provider.name} timed out after {self.timeout_seconds}s")
+        except Exception as e:
+            print(f"[ERROR] {provider.name}: {e}")
+        return None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+external_context_fetcher = ExternalContextFetcher(
+    providers=[
+        WikipediaProvider(timeout_seconds=EXTERNAL_CONTEXT_TIMEOUT_SECONDS),
+        DuckDuckGoProvider(timeout_seconds=EXTERNAL_CONTEXT_TIMEOUT_SECONDS)
+    ],
+    timeout_seconds=EXTERNAL_CONTEXT_TIMEOUT_SECONDS,
+    ttl_seconds=EXTERNAL_CONTEXT_TTL_SECONDS,
+    max_entries=EXTERNAL_CONTEXT_CACHE_SIZE
+)
+
+
+def shutdown_external_context_executor():
+    external_context_fetcher.shutdown()
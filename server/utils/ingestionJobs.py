@@ -0,0 +1,323 @@
+import asyncio
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from uuid import uuid4
+from pymongo.errors import DuplicateKeyError
+
+from server.utils.config import (INGESTION_WORKERS, INGESTION_MODE, INGESTION_STREAMING_MIN_PAGES,
+                                 INGESTION_MEMORY_BUDGET_MB, EMBED_BATCH_SIZE, EMBED_WORKERS,
+                                 INGESTION_HEARTBEAT_SECONDS, INGESTION_STALE_SECONDS)
+from server.utils.db import db_instance
+from server.utils.PDFProcess import iter_pdf_pages, DocumentProfileBuilder
+from server.utils.pdfExtraction import count_pages
+from server.utils.ingestionPipeline import IngestionPipeline, PIPELINE_STAGES, queue_size_for_budget
+from server.utils.llm import agenerate_structured_summary, StreamingSummarizer
+from server.utils.pdfBlobs import mark_pdf_blob_ready, discard_pdf_blob
+
+INGESTION_STAGES = PIPELINE_STAGES + ["summarize"]
+# Jobs in these states are owned by a live worker as long as their heartbeat is fresh
+ACTIVE_JOB_STATUSES = ["queued", "running"]
+
+# CPU/IO heavy stages run here so the event loop keeps serving other requests
+_executor = ThreadPoolExecutor(max_workers=INGESTION_WORKERS, thread_name_prefix="ingestion")
+# At most INGESTION_WORKERS documents are in flight, the rest wait in "queued"
+_job_slots = asyncio.Semaphore(INGESTION_WORKERS)
+# Keep references to running tasks so they are not garbage collected mid-flight
+_running_jobs = set()
+_recovery = {"task": None}
+
+
+def extract_summary_title(summary_text: str) -> str:
+    match = re.search(r"\*\*Title:\*\*\s*(.*)", summary_text)
+    if match:
+        return match.group(1).strip()
+    return "Unknown Title"
+
+
+def _new_job_fields(now: datetime) -> dict:
+    return {
+        "status": "queued",
+        "stages": {stage: {"status": "pending", "seconds": None} for stage in INGESTION_STAGES},
+        "pipeline": None,
+        "error": None,
+        "updated_at": now
+    }
+
+
+def _start_job_task(job_id: str, pdf_id: str, user_id: str, file_path: str):
+    task = asyncio.create_task(_run_ingestion_job(job_id, pdf_id, user_id, file_path))
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+
+
+async def enqueue_ingestion_job(pdf_id: str, user_id: str, file_path: str, job_id: str = None) -> str:
+    """
+    `pdf_id` is the storage id (the blob's vector_id): every `pdfs` record sharing it is
+    updated when the job finishes.
+    """
+    job_id = job_id or str(uuid4())
+    now = datetime.utcnow()
+
+    await db_instance.db["ingestion_jobs"].insert_one({
+        "job_id": job_id,
+        "pdf_id": pdf_id,
+        "user_id": user_id,
+        "created_at": now,
+        **_new_job_fields(now)
+    })
+
+    _start_job_task(job_id, pdf_id, user_id, file_path)
+    return job_id
+
+
+def stale_job_cutoff() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=INGESTION_STALE_SECONDS)
+
+
+async def resume_ingestion_job(job_id: str, pdf_id: str, user_id: str, file_path: str) -> bool:
+    """
+    Restarts a job whose worker is gone, on this worker. The claim is atomic, so when several
+    workers find the same stale job only one of them runs it. Returns False if the job turned
+    out to be alive (or finished) after all.
+    """
+    now = datetime.utcnow()
+    jobs = db_instance.db["ingestion_jobs"]
+
+    claimed = await jobs.update_one(
+        {"job_id": job_id, "status": {"$in": ACTIVE_JOB_STATUSES}, "updated_at": {"$lt": stale_job_cutoff()}},
+        {"$set": _new_job_fields(now)}
+    )
+    if claimed.modified_count == 0:
+        if await jobs.find_one({"job_id": job_id}, {"_id": 1}):
+            return False
+        try:
+            await jobs.insert_one({"job_id": job_id, "pdf_id": pdf_id, "user_id": user_id, "created_at": now,
+                                   **_new_job_fields(now)})
+        except DuplicateKeyError:
+            return False
+
+    _start_job_task(job_id, pdf_id, user_id, file_path)
+    return True
+
+
+async def take_over_stalled_blob(blob: dict, user_id: str, file_path: str) -> bool:
+    """
+    Called when an upload deduplicates onto a blob that is still "processing". If the blob's job
+    lost its worker, it is restarted here instead of leaving the new record waiting on it forever;
+    when the original upload is gone, the duplicate's file at `file_path` takes its place.
+    Returns True if `file_path` was adopted and must be kept.
+    """
+    job = await db_instance.db["ingestion_jobs"].find_one({"job_id": blob["job_id"]})
+    if job:
+        alive = job["status"] not in ACTIVE_JOB_STATUSES or job["updated_at"] >= stale_job_cutoff()
+    else:
+        # The job record is inserted right after the blob; only an old blob without one is orphaned
+        alive = blob["created_at"] >= stale_job_cutoff()
+    if alive:
+        return False
+
+    adopted = False
+    if not os.path.exists(blob["file_path"]):
+        os.replace(file_path, blob["file_path"])
+        adopted = True
+
+    if await resume_ingestion_job(blob["job_id"], blob["vector_id"], job["user_id"] if job else user_id,
+                                  blob["file_path"]):
+        print(f"[INFO] Took over stalled ingestion job {blob['job_id']}")
+    return adopted
+
+
+async def _fail_job(job_id: str, pdf_id: str, error: str):
+    await _update_job(job_id, {"status": "failed", "error": error})
+    await db_instance.db["pdfs"].update_many({"vector_id": pdf_id}, {"$set": {"status": "failed"}})
+    await discard_pdf_blob(pdf_id)
+
+
+async def recover_interrupted_jobs():
+    """
+    Requeues queued/running jobs whose heartbeat stopped (their worker restarted mid-ingestion),
+    or marks them failed when the uploaded file is gone, so their documents and blobs do not
+    stay "processing" forever.
+    """
+    cursor = db_instance.db["ingestion_jobs"].find({
+        "status": {"$in": ACTIVE_JOB_STATUSES},
+        "updated_at": {"$lt": stale_job_cutoff()}
+    })
+
+    async for job in cursor:
+        blob = await db_instance.db["pdf_blobs"].find_one({"vector_id": job["pdf_id"]})
+        file_path = blob.get("file_path") if blob else None
+
+        if file_path and os.path.exists(file_path):
+            if await resume_ingestion_job(job["job_id"], job["pdf_id"], job["user_id"], file_path):
+                print(f"[INFO] Requeued interrupted ingestion job {job['job_id']}")
+        else:
+            await _fail_job(job["job_id"], job["pdf_id"],
+                            "Ingestion was interrupted and the upload is no longer available")
+            print(f"[INFO] Marked interrupted ingestion job {job['job_id']} as failed")
+
+
+async def _recovery_loop():
+    while True:
+        try:
+            await recover_interrupted_jobs()
+        except Exception as e:
+            print(f"[ERROR] Recovering interrupted ingestion jobs: {e}")
+        await asyncio.sleep(INGESTION_STALE_SECONDS)
+
+
+def start_job_recovery():
+    _recovery["task"] = asyncio.create_task(_recovery_loop())
+
+
+def stop_job_recovery():
+    if _recovery["task"]:
+        _recovery["task"].cancel()
+
+
+async def _heartbeat(job_id: str):
+    while True:
+        await asyncio.sleep(INGESTION_HEARTBEAT_SECONDS)
+        await db_instance.db["ingestion_jobs"].update_one(
+            {"job_id": job_id}, {"$set": {"updated_at": datetime.utcnow()}}
+        )
+
+
+async def get_ingestion_job(job_id: str):
+    return await db_instance.db["ingestion_jobs"].find_one({"job_id": job_id}, {"_id": 0})
+
+
+async def _update_job(job_id: str, fields: dict):
+    fields["updated_at"] = datetime.utcnow()
+    await db_instance.db["ingestion_jobs"].update_one({"job_id": job_id}, {"$set": fields})
+
+
+async def _run_stage(job_id: str, stage: str, func, *args):
+    await _update_job(job_id, {f"stages.{stage}.status": "running"})
+
+    started = time.perf_counter()
+    if asyncio.iscoroutinefunction(func):
+        # LLM-bound stages are natively async and do not need a worker thread
+        result = await func(*args)
+    else:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(_executor, func, *args)
+
+    await _update_job(job_id, {
+        f"stages.{stage}.status": "done",
+        f"stages.{stage}.seconds": round(time.perf_counter() - started, 3)
+    })
+    return result
+
+
+def use_streaming_ingestion(file_path: str) -> bool:
+    if INGESTION_MODE == "auto":
+        return count_pages(file_path) > INGESTION_STREAMING_MIN_PAGES
+    return INGESTION_MODE == "streaming"
+
+
+async def _record_index_progress(pdf_id: str, profile: dict, indexed_pages: int, total_pages: int):
+    # $max: progress callbacks are scheduled from another thread and may be applied out of order
+    update = {
+        "$max": {"indexed_pages": indexed_pages},
+        "$set": {
+            "total_pages": total_pages,
+            # Header text for answers given before the final profile exists
+            "profile": profile
+        }
+    }
+    await db_instance.db["pdfs"].update_many({"vector_id": pdf_id}, update)
+    await db_instance.db["pdf_blobs"].update_one({"vector_id": pdf_id}, update)
+
+
+async def _run_pipeline(job_id: str, pipeline: IngestionPipeline, profile_builder: DocumentProfileBuilder,
+                        file_path: str):
+    # The pipeline stages overlap, so they start together and report once the last chunk is stored
+    await _update_job(job_id, {f"stages.{stage}.status": "running" for stage in PIPELINE_STAGES})
+
+    loop = asyncio.get_running_loop()
+    progress_writes = []
+
+    def on_progress(indexed_pages: int, total_pages: int):
+        # Runs on the pipeline's store thread: hand the watermark to the event loop without waiting
+        progress_writes.append(asyncio.run_coroutine_threadsafe(_record_index_progress(
+            pipeline.pdf_id, profile_builder.build(), indexed_pages, total_pages
+        ), loop))
+
+    pipeline.on_progress = on_progress
+    try:
+        report = await loop.run_in_executor(_executor, pipeline.run, iter_pdf_pages(file_path))
+    finally:
+        # Settle every progress write before the final result, so a late one cannot overwrite it
+        results = await asyncio.gather(*[asyncio.wrap_future(f) for f in progress_writes], return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"[ERROR] Recording index progress of job {job_id}: {result}")
+
+    fields = {"pipeline": {key: report[key] for key in ("seconds", "pages", "chunks", "chunks_per_second")}}
+    for stage, stats in report["stages"].items():
+        fields[f"stages.{stage}"] = {
+            "status": "done",
+            "seconds": stats["seconds"],
+            "items_per_second": stats["items_per_second"]
+        }
+    await _update_job(job_id, fields)
+
+
+async def _run_ingestion_job(job_id: str, pdf_id: str, user_id: str, file_path: str):
+    # Proves the job is alive (also while it waits for a slot) so recovery leaves it alone
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        await _ingest(job_id, pdf_id, user_id, file_path)
+    finally:
+        heartbeat.cancel()
+
+
+async def _ingest(job_id: str, pdf_id: str, user_id: str, file_path: str):
+    async with _job_slots:
+        await _update_job(job_id, {"status": "running"})
+
+        try:
+            loop = asyncio.get_running_loop()
+            profile_builder = DocumentProfileBuilder(file_path)
+
+            if await loop.run_in_executor(_executor, use_streaming_ingestion, file_path):
+                # Pages are summarised section by section as they stream past instead of being kept
+                summarizer = StreamingSummarizer(loop)
+                pipeline = IngestionPipeline(
+                    pdf_id, user_id, keep_pages=False,
+                    on_page=[profile_builder.add_page, summarizer.add_page],
+                    queue_size=queue_size_for_budget(INGESTION_MEMORY_BUDGET_MB * 1024 * 1024,
+                                                     EMBED_BATCH_SIZE, EMBED_WORKERS)
+                )
+                summarize = summarizer.afinish
+            else:
+                pipeline = IngestionPipeline(pdf_id, user_id, on_page=[profile_builder.add_page])
+                summarize = partial(agenerate_structured_summary, pipeline.pages)
+
+            await _run_pipeline(job_id, pipeline, profile_builder, file_path)
+            profile = profile_builder.build()
+            summary_text = await _run_stage(job_id, "summarize", summarize)
+        except Exception as e:
+            print(f"[ERROR] Ingestion job {job_id} failed: {e}")
+            await _fail_job(job_id, pdf_id, str(e))
+            return
+
+        result = {
+            "title": extract_summary_title(summary_text),
+            "summary": summary_text,
+            "profile": profile,
+            "indexed_pages": profile["page_count"],
+            "total_pages": profile["page_count"]
+        }
+        await mark_pdf_blob_ready(pdf_id, result)
+        await db_instance.db["pdfs"].update_many({"vector_id": pdf_id}, {"$set": {"status": "ready", **result}})
+        await _update_job(job_id, {"status": "done"})
+
+
+def shutdown_ingestion_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
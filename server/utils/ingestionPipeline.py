@@ -0,0 +1,267 @@
+"""
+Staged ingestion pipeline.
+
+Pages flow through four stages running in their own threads and connected by bounded queues,
+so parsing, splitting, embedding and vector-store writes overlap instead of running back to back:
+
+    parse -> split -> embed (EMBED_WORKERS threads, EMBED_BATCH_SIZE chunks per call) -> store
+
+A full queue blocks the stage feeding it, which keeps at most a few batches in memory.
+Each stage reports how many items it handled and how long it was busy (queue waits excluded).
+
+In streaming mode (`keep_pages=False`) parsed pages are only handed to the `on_page` observers
+(profile builder, streaming summarizer) instead of being kept, and `queue_size_for_budget` sizes
+the queues so the chunks and vectors in flight fit a memory budget, whatever the page count.
+
+Embedding workers may finish batches out of order, so the store stage tracks a watermark:
+the number of leading pages whose chunks are all stored (and therefore searchable).
+"""
+
+import queue
+import threading
+import time
+
+from server.utils.config import EMBED_BATCH_SIZE, EMBED_WORKERS, PIPELINE_QUEUE_SIZE, PROGRESSIVE_INDEX_PAGES
+from server.utils.PDFProcess import get_embeddings, open_vector_store
+from server.utils.textSplitter import PageAwareTextSplitter
+
+PIPELINE_STAGES = ["parse", "split", "embed", "store"]
+
+# Marks the end of a stage's output
+_DONE = object()
+
+# Rough cost of one chunk in flight: ~1000 characters of text, its metadata and a 384-float
+# vector as a Python list
+ESTIMATED_BYTES_PER_CHUNK_IN_FLIGHT = 16 * 1024
+
+
+def queue_size_for_budget(budget_bytes: int, batch_size: int, embed_workers: int) -> int:
+    """
+    Queue depth that keeps the batches of the three queues, plus the one each embedding worker
+    and the store stage hold, within `budget_bytes`.
+    """
+    batch_bytes = batch_size * ESTIMATED_BYTES_PER_CHUNK_IN_FLIGHT
+    return max(1, (budget_bytes // batch_bytes - embed_workers - 1) // 3)
+
+
+class PipelineAborted(Exception):
+    pass
+
+
+class StageStats:
+    def __init__(self):
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+
+    def as_dict(self) -> dict:
+        return {
+            "items": self.items,
+            "seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else None
+        }
+
+
+class IngestionPipeline:
+    """
+    Embeds and stores the pages of one document under `pdf_id`. Chunks are tagged with
+    pdf_id/user_id (the shared layout filters on them) and stored with ids `{pdf_id}_{n}`.
+    """
+
+    def __init__(self, pdf_id: str, user_id: str = None, batch_size: int = EMBED_BATCH_SIZE,
+                 embed_workers: int = EMBED_WORKERS, queue_size: int = PIPELINE_QUEUE_SIZE,
+                 on_progress=None, progress_every: int = PROGRESSIVE_INDEX_PAGES,
+                 keep_pages: bool = True, on_page=()):
+        self.pdf_id = pdf_id
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.embed_workers = embed_workers
+        self.stats = {stage: StageStats() for stage in PIPELINE_STAGES}
+        self.pages = []
+        self.total_pages = None
+        self.indexed_pages = 0
+        # Called from the store thread as on_progress(indexed_pages, total_pages)
+        self.on_progress = on_progress
+        self.progress_every = progress_every
+        self.keep_pages = keep_pages
+        # Called from the parse thread with every page, in order
+        self.on_page = list(on_page)
+
+        self._pages = queue.Queue(maxsize=queue_size)
+        self._batches = queue.Queue(maxsize=queue_size)
+        self._embedded = queue.Queue(maxsize=queue_size)
+        self._abort = threading.Event()
+        self._errors = []
+
+    def _put(self, q: queue.Queue, item):
+        while True:
+            if self._abort.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _get(self, q: queue.Queue):
+        while True:
+            if self._abort.is_set():
+                raise PipelineAborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def _parse(self, pages):
+        iterator = iter(pages)
+        while True:
+            started = time.perf_counter()
+            page = next(iterator, _DONE)
+            if page is _DONE:
+                break
+            self.stats["parse"].record(1, time.perf_counter() - started)
+            if self.total_pages is None:
+                self.total_pages = page.metadata.get("total_pages")
+            for observer in self.on_page:
+                observer(page)
+            if self.keep_pages:
+                self.pages.append(page)
+            self._put(self._pages, page)
+        self._put(self._pages, _DONE)
+
+    def _split(self):
+        # Items are (chunk id, split, index of its first page); batches are (sequence, items, pages complete)
+        splitter = PageAwareTextSplitter(chunk_size=1000, chunk_overlap=200)
+        batch = []
+        chunk_index = 0
+        sequence = 0
+
+        def add_splits(splits: list):
+            nonlocal chunk_index
+            for page_index, split in splits:
+                split.metadata["pdf_id"] = self.pdf_id
+                if self.user_id:
+                    split.metadata["user_id"] = self.user_id
+                batch.append((f"{self.pdf_id}_{chunk_index}", split, page_index))
+                chunk_index += 1
+
+        def send_full_batches():
+            nonlocal batch, sequence
+            while len(batch) >= self.batch_size:
+                rest = batch[self.batch_size:]
+                # Pages before the first leftover chunk (and before any text the splitter still holds)
+                # are fully contained in this batch or earlier ones
+                pages_complete = min(rest[0][2], splitter.pending_page) if rest else splitter.pending_page
+                self._put(self._batches, (sequence, batch[:self.batch_size], pages_complete))
+                sequence += 1
+                batch = rest
+
+        while (page := self._get(self._pages)) is not _DONE:
+            started = time.perf_counter()
+            splits = splitter.add_page(page)
+            add_splits(splits)
+            self.stats["split"].record(len(splits), time.perf_counter() - started)
+            send_full_batches()
+
+        started = time.perf_counter()
+        splits = splitter.finish()
+        add_splits(splits)
+        self.stats["split"].record(len(splits), time.perf_counter() - started)
+        send_full_batches()
+
+        # Sent even when empty, so trailing pages without text still complete the watermark
+        self._put(self._batches, (sequence, batch, splitter.pending_page))
+        for _ in range(self.embed_workers):
+            self._put(self._batches, _DONE)
+
+    def _embed(self):
+        embeddings = get_embeddings()
+        while (item := self._get(self._batches)) is not _DONE:
+            sequence, batch, pages_complete = item
+            started = time.perf_counter()
+            vectors = embeddings.embed_documents([split.page_content for _, split, _ in batch]) if batch else []
+            self.stats["embed"].record(len(batch), time.perf_counter() - started)
+            self._put(self._embedded, (sequence, batch, vectors, pages_complete))
+        self._put(self._embedded, _DONE)
+
+    def _store(self):
+        collection = open_vector_store(self.pdf_id)._collection
+        remaining_embedders = self.embed_workers
+        # sequence -> pages complete, for batches stored ahead of an earlier one
+        stored = {}
+        next_sequence = 0
+        reported_pages = 0
+
+        while remaining_embedders:
+            item = self._get(self._embedded)
+            if item is _DONE:
+                remaining_embedders -= 1
+                continue
+
+            sequence, batch, vectors, pages_complete = item
+            if batch:
+                started = time.perf_counter()
+                collection.upsert(
+                    ids=[chunk_id for chunk_id, _, _ in batch],
+                    embeddings=vectors,
+                    documents=[split.page_content for _, split, _ in batch],
+                    metadatas=[split.metadata for _, split, _ in batch]
+                )
+                self.stats["store"].record(len(batch), time.perf_counter() - started)
+
+            stored[sequence] = pages_complete
+            while next_sequence in stored:
+                self.indexed_pages = stored.pop(next_sequence)
+                next_sequence += 1
+
+            if self.on_progress and self.indexed_pages - reported_pages >= self.progress_every:
+                reported_pages = self.indexed_pages
+                self.on_progress(self.indexed_pages, self.total_pages)
+
+    def _run_stage(self, target, *args):
+        try:
+            target(*args)
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            self._errors.append(e)
+            self._abort.set()
+
+    def run(self, pages) -> dict:
+        """
+        Consumes `pages` (an iterable of page Documents, e.g. `iter_pdf_pages(file_path)`) and
+        blocks until every chunk is stored. Re-raises the first stage error, if any.
+        Unless streaming, the parsed pages are kept in `self.pages` for the summary.
+        """
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self._parse, pages), name="pipeline-parse"),
+            threading.Thread(target=self._run_stage, args=(self._split,), name="pipeline-split"),
+            threading.Thread(target=self._run_stage, args=(self._store,), name="pipeline-store"),
+        ] + [
+            threading.Thread(target=self._run_stage, args=(self._embed,), name=f"pipeline-embed-{i}")
+            for i in range(self.embed_workers)
+        ]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        wall_seconds = time.perf_counter() - started
+        chunks = self.stats["store"].items
+        return {
+            "seconds": round(wall_seconds, 3),
+            "pages": self.indexed_pages,
+            "chunks": chunks,
+            "chunks_per_second": round(chunks / wall_seconds, 1) if wall_seconds else None,
+            "stages": {stage: stats.as_dict() for stage, stats in self.stats.items()}
+        }
@@ -1,14 +1,16 @@
 import os
-import glob
+import asyncio
+import threading
+from functools import partial
+from fastapi.concurrency import run_in_threadpool
 from langchain_core.runnables import RunnablePassthrough
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain_community.tools import WikipediaQueryRun, DuckDuckGoSearchRun
-from langchain_community.utilities import WikipediaAPIWrapper
-from server.utils.PDFProcess import get_vector_store
-from server.utils.QAScript import evaluate_response
-from server.utils.config import GEMINAI_MODEL, GEMINAI_API_KEY, UPLOAD_DIR
+from server.utils.PDFProcess import get_vector_store, get_search_filter
+from server.utils.QAScript import aevaluate_response
+from server.utils.externalContext import external_context_fetcher
+from server.utils.config import (GEMINAI_MODEL, GEMINAI_API_KEY, SUMMARY_SINGLE_PASS_CHARS, SUMMARY_SECTION_CHARS,
+                                 SUMMARY_MAX_CONCURRENCY, CHAT_GENERATION_MODE, SPECULATIVE_TEMPERATURES)
 
 llm = ChatGoogleGenerativeAI(
     model=GEMINAI_MODEL,
@@ -17,20 +19,10 @@ llm = ChatGoogleGenerativeAI(
     convert_system_message_to_human=True
 )
 
-wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
-search = DuckDuckGoSearchRun()
+_llms_by_temperature = {llm.temperature: llm}
 
 
-def generate_structured_summary(file_path: str) -> str:
-    loader = PyMuPDFLoader(file_path)
-    docs = loader.load()
-
-    template = """
-    You are an expert academic researcher. Your task is to read the provided research paper 
-    content and generate a structured summary following the required format.
-    
-    **IMPORTANT: Limit your answer to 1000 words.**
-
+SUMMARY_STRUCTURE = """
     Strictly follow this structure:
 
     1. **Title & Authors / Abstract**
@@ -52,97 +44,311 @@ def generate_structured_summary(file_path: str) -> str:
 
     5. **Conclusion**
        - Summarize the authors' final insights, implications, or next steps.
+"""
+
+
+def group_pages_into_sections(docs: list, max_chars: int) -> list:
+    sections = []
+    current = []
+    current_chars = 0
 
+    for doc in docs:
+        if current and current_chars + len(doc.page_content) > max_chars:
+            sections.append(" ".join(current))
+            current = []
+            current_chars = 0
+        current.append(doc.page_content)
+        current_chars += len(doc.page_content)
+
+    if current:
+        sections.append(" ".join(current))
+
+    return sections
+
+
+SINGLE_PASS_SUMMARY_TEMPLATE = """
+    You are an expert academic researcher. Your task is to read the provided research paper 
+    content and generate a structured summary following the required format.
+    
+    **IMPORTANT: Limit your answer to 1000 words.**
+""" + SUMMARY_STRUCTURE + """
     --------------------------
     ### Research Paper Text:
     {text}
     """
 
-    prompt = PromptTemplate(template=template, input_variables=["text"])
 
+single_pass_summary_chain = PromptTemplate(template=SINGLE_PASS_SUMMARY_TEMPLATE, input_variables=["text"]) | llm
+
+
+async def asummarize_single_pass(docs: list) -> str:
     full_text = " ".join([d.page_content for d in docs])
-    chain = prompt | llm
 
-    try:
-        result = chain.invoke({"text": full_text})
-        # print(f"DBUG Results text: {result.content}")
-        return result.content
-    except Exception as e:
-        return f"Error generating summary: {str(e)}"
+    result = await single_pass_summary_chain.ainvoke({"text": full_text})
+    return result.content
 
 
-def get_external_context(question: str) -> str:
-    # print(f"[DEBUG] Fetching external context for: {question}")
-    external_context = ""
+SECTION_SUMMARY_TEMPLATE = """
+    You are an expert academic researcher. Below is section {index} of a long research document.
+    Summarise it in at most 300 words. Keep the title and author names if they appear, and preserve
+    the problem statement, methods, datasets, specific numbers/metrics and conclusions it contains.
 
-    # Try Wikipedia first
-    try:
-        wiki_res = wikipedia.run(question)
-        external_context += f"\n\n--- WIKIPEDIA RESULTS ---\n{wiki_res}"
-    except Exception as e:
-        print(f"Wiki Error: {e}")
+    --------------------------
+    ### Section Text:
+    {text}
+    """
+
+REDUCE_SUMMARY_TEMPLATE = """
+    You are an expert academic researcher. The following are summaries of consecutive sections of one
+    research paper. Combine them into a single structured summary following the required format.
+    
+    **IMPORTANT: Limit your answer to 1000 words.**
+""" + SUMMARY_STRUCTURE + """
+    --------------------------
+    ### Section Summaries:
+    {text}
+    """
+
+section_summary_chain = PromptTemplate(template=SECTION_SUMMARY_TEMPLATE, input_variables=["index", "text"]) | llm
+reduce_summary_chain = PromptTemplate(template=REDUCE_SUMMARY_TEMPLATE, input_variables=["text"]) | llm
+
+
+async def areduce_section_summaries(partial_summaries: list) -> str:
+    combined = "\n\n".join(
+        f"--- Section {i + 1} ---\n{summary}" for i, summary in enumerate(partial_summaries)
+    )
+    result = await reduce_summary_chain.ainvoke({"text": combined})
+    return result.content
+
+
+async def asummarize_map_reduce(docs: list) -> str:
+    """
+    Summarises each section concurrently (bounded by SUMMARY_MAX_CONCURRENCY), then folds the
+    partial summaries into the standard 5-part structure.
+    """
+    sections = group_pages_into_sections(docs, SUMMARY_SECTION_CHARS)
+    semaphore = asyncio.Semaphore(SUMMARY_MAX_CONCURRENCY)
+
+    async def summarize_section(index: int, text: str) -> str:
+        async with semaphore:
+            result = await section_summary_chain.ainvoke({"index": index, "text": text})
+            return result.content
+
+    partial_summaries = await asyncio.gather(
+        *[summarize_section(i + 1, text) for i, text in enumerate(sections)]
+    )
+    return await areduce_section_summaries(partial_summaries)
+
+
+class StreamingSummarizer:
+    """
+    Summarises a document from pages fed one at a time (from a worker thread), for streaming
+    ingestion. Text is buffered up to SUMMARY_SINGLE_PASS_CHARS; past that, every full section
+    is summarised on the event loop right away and only its summary is kept. At most
+    SUMMARY_MAX_CONCURRENCY sections are in flight: `add_page` blocks until a slot frees up.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._pages = []
+        self._chars = 0
+        # Only the summary text of finished sections is kept, not their futures and messages
+        self._summaries = []
+        self._in_flight = set()
+        self._errors = []
+        self._single_pass = True
+        self._slots = threading.BoundedSemaphore(SUMMARY_MAX_CONCURRENCY)
+
+    def add_page(self, doc):
+        text = doc.page_content
+
+        if self._single_pass and self._chars + len(text) <= SUMMARY_SINGLE_PASS_CHARS:
+            # Still short enough for a single-pass summary
+            self._pages.append(text)
+            self._chars += len(text)
+            return
+
+        if self._single_pass:
+            # Switching to map-reduce: cut what was buffered so far into sections
+            self._single_pass = False
+            buffered = self._pages
+            self._pages, self._chars = [], 0
+            for page_text in buffered:
+                self._append_to_section(page_text)
+
+        self._append_to_section(text)
+
+    def _append_to_section(self, text: str):
+        if self._pages and self._chars + len(text) > SUMMARY_SECTION_CHARS:
+            self._submit_section(" ".join(self._pages))
+            self._pages, self._chars = [], 0
+        self._pages.append(text)
+        self._chars += len(text)
+
+    def _submit_section(self, text: str):
+        self._slots.acquire()
+        index = len(self._summaries)
+        self._summaries.append(None)
+        future = asyncio.run_coroutine_threadsafe(
+            section_summary_chain.ainvoke({"index": index + 1, "text": text}), self.loop
+        )
+        self._in_flight.add(future)
+        future.add_done_callback(partial(self._section_done, index))
+
+    def _section_done(self, index: int, future):
+        try:
+            self._summaries[index] = future.result().content
+        except BaseException as e:
+            self._errors.append(e)
+        finally:
+            self._in_flight.discard(future)
+            self._slots.release()
+
+    async def afinish(self) -> str:
+        # Same contract as agenerate_structured_summary: errors come back as the summary text
+        try:
+            if self._single_pass:
+                result = await single_pass_summary_chain.ainvoke({"text": " ".join(self._pages)})
+                return result.content
+
+            if self._pages:
+                await run_in_threadpool(self._submit_section, " ".join(self._pages))
+                self._pages, self._chars = [], 0
+
+            await asyncio.gather(*[asyncio.wrap_future(future) for future in list(self._in_flight)],
+                                 return_exceptions=True)
+            if self._errors:
+                raise self._errors[0]
+            return await areduce_section_summaries(self._summaries)
+        except Exception as e:
+            return f"Error generating summary: {str(e)}"
+
+
+async def agenerate_structured_summary(docs: list) -> str:
+    # Short papers fit in one prompt; long theses/proceedings go through map-reduce
+    total_chars = sum(len(d.page_content) for d in docs)
 
-    # Try DuckDuckGo
     try:
-        ddg_res = search.run(question)
-        external_context += f"\n\n--- INTERNET SEARCH RESULTS ---\n{ddg_res}"
+        if total_chars <= SUMMARY_SINGLE_PASS_CHARS:
+            return await asummarize_single_pass(docs)
+        return await asummarize_map_reduce(docs)
     except Exception as e:
-        print(f"DDG Error: {e}")
+        return f"Error generating summary: {str(e)}"
 
-    return external_context
 
+def format_document_header(profile: dict) -> str:
+    if not profile or not profile.get("header_text"):
+        return ""
+    return f"--- START OF DOCUMENT METADATA ---\n{profile['header_text']}\n--- END OF DOCUMENT METADATA ---\n"
 
-def get_answer_from_pdf(question: str, pdf_id: str, chat_history: list, study_mode: bool = False):
-    if not pdf_id:
-        return {
-            "result": "Error: pdf_id is missing.",
-            "source_documents": []
-        }
 
+async def aretrieve_documents(question: str, pdf_id: str) -> list:
     # Standard MMR Retrieval
-    vector_store = get_vector_store(pdf_id)
+    vector_store = await run_in_threadpool(get_vector_store, pdf_id)
+    search_kwargs = {"k": 5, "fetch_k": 20, "lambda_mult": 0.5}
+
+    search_filter = get_search_filter(pdf_id)
+    if search_filter:
+        search_kwargs["filter"] = search_filter
+
     retriever = vector_store.as_retriever(
         search_type="mmr",
-        search_kwargs={"k": 5, "fetch_k": 20, "lambda_mult": 0.5}
+        search_kwargs=search_kwargs
     )
 
     try:
-        docs = retriever.invoke(question)
+        return await retriever.ainvoke(question)
     except Exception as e:
         print("Retriever error:", e)
-        docs = []
-        pdf_context = ""
+        return []
 
-    external_context = ""
+
+def build_answer_prompt(study_mode: bool) -> PromptTemplate:
     if study_mode:
-        external_context = get_external_context(question)
+        # TEACHER PROMPT
+        template = """
+            You are an expert Teacher. Your goal is to TEACH the user about the topic using the provided content.
+
+            Sources Available:
+            1. A PDF Document uploaded by the user.
+            2. Wikipedia and Internet Search results.
+
+            Instructions:
+            - Prioritize the **PDF Content** as the primary source of truth.
+            - Use the **External Context** (Wikipedia/Internet) to explain concepts that are difficult, define terms, or provide broader examples not found in the PDF.
+            - If the PDF mentions a concept briefly, use the external info to expand on it comprehensively.
+            - Structure your answer like a tutorial or a lesson. Use bullet points and clear headings.
+            - If the answer is not in any of the sources, admit it.
+
+            -----------------------------
+            Conversation History:
+            {history}
+
+            Combined Context:
+            {context}
+
+            User Question:
+            {question}
+            """
+    else:
+        # STANDARD RAG PROMPT
+        template = """
+            You are a research assistant. Answer the User Question using ONLY the provided context.
 
-    first_page_text = ""
-    found_file_path = None
+            1. The context comes from a PDF document.
+            2. If the answer is not in the context, say "I cannot find the answer in the document."
+            3. Do NOT hallucinate.
 
-    try:
-        # Construct the pattern to find the file
-        # ensure UPLOAD_DIR does not end with a slash to avoid double slashes
-        clean_dir = UPLOAD_DIR.rstrip("/")
-        search_pattern = f"{clean_dir}/{pdf_id}_*.pdf"
-
-        files = glob.glob(search_pattern)
-
-        if files:
-            file_path = files[0]
-            loader = PyMuPDFLoader(file_path)
-            # Load the first 2 pages (in case Title is on page 2 or cover sheet exists)
-            pages = loader.load()
-
-            if len(pages) > 0:
-                p1 = pages[0].page_content
-                p2 = pages[1].page_content if len(pages) > 1 else ""
-                first_page_text = f"--- START OF DOCUMENT METADATA ---\n{p1}\n{p2}\n--- END OF DOCUMENT METADATA ---\n"
-        else:
-            print(f"Error: No file found for ID {pdf_id} in {clean_dir}")
+            -----------------------------
+            Conversation History:
+            {history}
 
-    except Exception as e:
-        print(f"Error loading first page: {e}")
+            Context:
+            {context}
+
+            User Question:
+            {question}
+            """
+
+    return PromptTemplate(
+        template=template,
+        input_variables=["context", "history", "question"]
+    )
+
+
+def format_chat_history(chat_history: list) -> str:
+    return "\n".join(
+        [f"{m['role']}: {m['message']}" for m in chat_history]
+    )
+
+
+def format_page_citation(metadata: dict) -> str:
+    # Chunk metadata stores 0-based page numbers; chunks from before page_end existed cover one page
+    page = metadata.get("page")
+    if page is None:
+        return ""
+    page_end = metadata.get("page_end", page)
+    return f"[p. {page + 1}] " if page_end == page else f"[pp. {page + 1}-{page_end + 1}] "
+
+
+def build_source_documents(first_page_text: str, docs: list) -> list:
+    header_preview = first_page_text[:150].replace("\n",
+                                                   " ") + "..." if first_page_text else "(Error: Could not load Page 1 Text)"
+
+    return [header_preview] + [format_page_citation(d.metadata) + d.page_content[:300] + "..." for d in docs]
+
+
+async def aprepare_context(question: str, pdf_id: str, profile: dict, study_mode: bool = False):
+    """
+    Runs retrieval and (in study mode) the external search concurrently. The document header
+    comes from the profile cached at ingestion, so the PDF itself is never touched here.
+    Returns (docs, first_page_text, full_context).
+    """
+    docs, external_context = await asyncio.gather(
+        aretrieve_documents(question, pdf_id),
+        external_context_fetcher.afetch(question) if study_mode else asyncio.sleep(0, result="")
+    )
+    first_page_text = format_document_header(profile)
 
     # Combine Context
     # We strip newlines to help Gemini process dense text better
@@ -151,65 +357,44 @@ def get_answer_from_pdf(question: str, pdf_id: str, chat_history: list, study_mo
     # Prepend the first page text. If empty, it adds nothing.
     full_context = first_page_text + "\n\n" + retrieved_content + "\n\n" + external_context
 
-    # Format History
-    formatted_history = "\n".join(
-        [f"{m['role']}: {m['message']}" for m in chat_history]
-    )
+    return docs, first_page_text, full_context
+
+
+def get_llm(temperature: float) -> ChatGoogleGenerativeAI:
+    """
+    Chat clients per temperature, created once and reused (used for speculative candidates).
+    """
+    if temperature not in _llms_by_temperature:
+        _llms_by_temperature[temperature] = ChatGoogleGenerativeAI(
+            model=GEMINAI_MODEL,
+            google_api_key=GEMINAI_API_KEY,
+            temperature=temperature,
+            convert_system_message_to_human=True
+        )
+    return _llms_by_temperature[temperature]
+
 
+def score_verdict(eval_result: dict) -> int:
+    if "error" in eval_result:
+        return -1
+    return int(bool(eval_result.get("is_relevant", False))) + int(bool(eval_result.get("is_faithful", False)))
+
+
+async def agenerate_sequential(prompt: PromptTemplate, inputs: dict, question: str, full_context: str):
+    """
+    Generate -> evaluate -> regenerate with the evaluator's feedback, up to MAX_RETRIES times.
+    Returns (answer, feedback, approved).
+    """
     MAX_RETRIES = 3
     current_answer = ""
     feedback = ""
+    approved = False
+
+    chain = prompt | llm
 
     for attempt in range(MAX_RETRIES):
         # print(f"[DEBUG] Generate Attempt {attempt + 1}/{MAX_RETRIES}")
 
-        # Prompting
-        if study_mode:
-            # TEACHER PROMPT
-            template = """
-                You are an expert Teacher. Your goal is to TEACH the user about the topic using the provided content.
-
-                Sources Available:
-                1. A PDF Document uploaded by the user.
-                2. Wikipedia and Internet Search results.
-
-                Instructions:
-                - Prioritize the **PDF Content** as the primary source of truth.
-                - Use the **External Context** (Wikipedia/Internet) to explain concepts that are difficult, define terms, or provide broader examples not found in the PDF.
-                - If the PDF mentions a concept briefly, use the external info to expand on it comprehensively.
-                - Structure your answer like a tutorial or a lesson. Use bullet points and clear headings.
-                - If the answer is not in any of the sources, admit it.
-
-                -----------------------------
-                Conversation History:
-                {history}
-
-                Combined Context:
-                {context}
-
-                User Question:
-                {question}
-                """
-        else:
-            # STANDARD RAG PROMPT
-            template = """
-                You are a research assistant. Answer the User Question using ONLY the provided context.
-
-                1. The context comes from a PDF document.
-                2. If the answer is not in the context, say "I cannot find the answer in the document."
-                3. Do NOT hallucinate.
-
-                -----------------------------
-                Conversation History:
-                {history}
-
-                Context:
-                {context}
-
-                User Question:
-                {question}
-                """
-
         feedback_section = ""
         if feedback:
             feedback_section = f"""
@@ -220,23 +405,11 @@ def get_answer_from_pdf(question: str, pdf_id: str, chat_history: list, study_mo
             Please correct your approach and generate a new answer that addresses this critique.
             """
 
-        prompt = PromptTemplate(
-            template=template,
-            input_variables=["context", "history", "question"]
-        )
-
-        chain = prompt | llm
-
         try:
-            final_output = chain.invoke({
-                "context": full_context,
-                "history": formatted_history,
-                "question": question,
-                "feedback_section": feedback_section
-            })
+            final_output = await chain.ainvoke({**inputs, "feedback_section": feedback_section})
             current_answer = final_output.content
 
-            eval_result = evaluate_response(question, full_context, current_answer)
+            eval_result = await aevaluate_response(question, full_context, current_answer)
 
             if "error" in eval_result:
                 feedback = f"Evaluation Error: {eval_result['error']}"
@@ -249,6 +422,7 @@ def get_answer_from_pdf(question: str, pdf_id: str, chat_history: list, study_mo
 
             if is_relevant and is_faithful:
                 # print("[DEBUG] Answer accepted by evaluator.")
+                approved = True
                 break
             else:
                 # print(f"[DEBUG] Answer rejected. Relevant: {is_relevant}, Faithful: {is_faithful}")
@@ -259,13 +433,112 @@ def get_answer_from_pdf(question: str, pdf_id: str, chat_history: list, study_mo
             print(current_answer)
             break
 
-    header_preview = first_page_text[:150].replace("\n",
-                                                   " ") + "..." if first_page_text else "(Error: Could not load Page 1 Text)"
+    return current_answer, feedback, approved
+
+
+async def agenerate_speculative(prompt: PromptTemplate, inputs: dict, question: str, full_context: str):
+    """
+    Generates and evaluates one candidate per SPECULATIVE_TEMPERATURES concurrently.
+    Returns the first candidate that passes the evaluator (cancelling the others), otherwise the
+    best-scored one. Returns (answer, feedback, approved).
+    """
+    async def candidate(temperature: float):
+        output = await (prompt | get_llm(temperature)).ainvoke(inputs)
+        return output.content, await aevaluate_response(question, full_context, output.content)
 
-    source_documents = [header_preview] + [d.page_content[:300] + "..." for d in docs]
+    tasks = [asyncio.create_task(candidate(t)) for t in SPECULATIVE_TEMPERATURES]
+    best = None
+    last_error = None
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                answer, eval_result = await next_done
+            except Exception as e:
+                last_error = e
+                continue
+
+            score = score_verdict(eval_result)
+            if score == 2:
+                return answer, "", True
+            if best is None or score > best[2]:
+                reasoning = eval_result.get("reasoning") or f"Evaluation Error: {eval_result.get('error')}"
+                best = (answer, reasoning, score)
+    finally:
+        # Stop paying for candidates we no longer need
+        for task in tasks:
+            task.cancel()
+
+    if best is None:
+        answer = f"Error generating answer: {str(last_error)}"
+        print(answer)
+        return answer, "", False
+
+    return best[0], best[1], False
+
+
+async def aget_answer_from_pdf(question: str, pdf_id: str, chat_history: list, profile: dict = None,
+                               study_mode: bool = False):
+    if not pdf_id:
+        return {
+            "result": "Error: pdf_id is missing.",
+            "source_documents": []
+        }
+
+    docs, first_page_text, full_context = await aprepare_context(question, pdf_id, profile, study_mode)
+
+    inputs = {
+        "context": full_context,
+        "history": format_chat_history(chat_history),
+        "question": question
+    }
+    prompt = build_answer_prompt(study_mode)
+
+    if CHAT_GENERATION_MODE == "speculative":
+        current_answer, feedback, approved = await agenerate_speculative(prompt, inputs, question, full_context)
+    else:
+        current_answer, feedback, approved = await agenerate_sequential(prompt, inputs, question, full_context)
 
     return {
         "result": current_answer,
-        "source_documents": source_documents,
-        "debug_eval": feedback
+        "source_documents": build_source_documents(first_page_text, docs),
+        "debug_eval": feedback,
+        "approved": approved
     }
+
+
+async def astream_answer_from_pdf(question: str, pdf_id: str, chat_history: list, profile: dict = None,
+                                  study_mode: bool = False):
+    """
+    Streaming variant of aget_answer_from_pdf for Server-Sent Events.
+    Yields (event, data) pairs: "sources" first, then "token" chunks as Gemini produces them,
+    then a single "verdict" from the evaluator. Tokens are already on the wire, so a rejected
+    answer is reported in the verdict instead of being regenerated.
+    """
+    docs, first_page_text, full_context = await aprepare_context(question, pdf_id, profile, study_mode)
+
+    yield "sources", build_source_documents(first_page_text, docs)
+
+    chain = build_answer_prompt(study_mode) | llm
+    answer_parts = []
+
+    async for chunk in chain.astream({
+        "context": full_context,
+        "history": format_chat_history(chat_history),
+        "question": question
+    }):
+        if chunk.content:
+            answer_parts.append(chunk.content)
+            yield "token", chunk.content
+
+    eval_result = await aevaluate_response(question, full_context, "".join(answer_parts))
+
+    if "error" in eval_result:
+        yield "verdict", {"accepted": False, "reasoning": f"Evaluation Error: {eval_result['error']}"}
+    else:
+        yield "verdict", {
+            "accepted": bool(eval_result.get("is_relevant", False) and eval_result.get("is_faithful", False)),
+            "is_relevant": eval_result.get("is_relevant", False),
+            "is_faithful": eval_result.get("is_faithful", False),
+            "reasoning": eval_result.get("reasoning", "No reasoning provided.")
+        }
@@ -0,0 +1,82 @@
+"""
+Moves per-PDF Chroma collections (`collection_{pdf_id}`) into the shared layout.
+
+Run with the API stopped:
+    VECTOR_STORE_LAYOUT=shared python -m server.utils.migrateVectorStore [--delete-old]
+"""
+
+import argparse
+import chromadb
+from pymongo import MongoClient
+
+from server.utils.config import VECTOR_DB_DIR, VECTOR_STORE_LAYOUT, MONGO_URI, MONGO_DB_NAME
+from server.utils.PDFProcess import get_collection_name
+
+BATCH_SIZE = 1000
+
+
+def find_owner(db, pdf_id: str):
+    record = db["pdfs"].find_one({"$or": [{"vector_id": pdf_id}, {"pdf_id": pdf_id}]}, {"user_id": 1})
+    return record["user_id"] if record else None
+
+
+def migrate_collection(client, db, name: str) -> int:
+    pdf_id = name[len("collection_"):]
+    source = client.get_collection(name)
+    target = client.get_or_create_collection(get_collection_name(pdf_id))
+    user_id = find_owner(db, pdf_id)
+
+    moved = 0
+    total = source.count()
+    while moved < total:
+        batch = source.get(offset=moved, limit=BATCH_SIZE, include=["embeddings", "documents", "metadatas"])
+        if not batch["ids"]:
+            break
+
+        metadatas = []
+        for metadata in batch["metadatas"]:
+            metadata = dict(metadata or {})
+            metadata["pdf_id"] = pdf_id
+            if user_id:
+                metadata["user_id"] = user_id
+            metadatas.append(metadata)
+
+        target.upsert(
+            ids=[f"{pdf_id}_{item_id}" for item_id in batch["ids"]],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=metadatas
+        )
+        moved += len(batch["ids"])
+
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-PDF Chroma collections into shared collections.")
+    parser.add_argument("--delete-old", action="store_true", help="drop each per-PDF collection once copied")
+    args = parser.parse_args()
+
+    if VECTOR_STORE_LAYOUT != "shared":
+        raise SystemExit("[ERROR] Set VECTOR_STORE_LAYOUT=shared before migrating.")
+
+    client = chromadb.PersistentClient(path=VECTOR_DB_DIR)
+    db = MongoClient(MONGO_URI)[MONGO_DB_NAME]
+
+    # Depending on the chromadb version list_collections returns names or Collection objects
+    names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+    legacy = [name for name in names if name.startswith("collection_")]
+    print(f"[INFO] Migrating {len(legacy)} per-PDF collections")
+
+    for name in legacy:
+        try:
+            moved = migrate_collection(client, db, name)
+            if args.delete_old:
+                client.delete_collection(name)
+            print(f"[SUCCESS] {name}: {moved} chunks")
+        except Exception as e:
+            print(f"[ERROR] {name}: {e}")
+
+
+if __name__ == "__main__":
+    main()
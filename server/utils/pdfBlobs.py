@@ -0,0 +1,77 @@
+"""
+Content-addressed PDF storage.
+
+Every distinct upload (by SHA-256) owns one "blob": the uploaded file, the Chroma collection
+and the generated summary. `pdfs` records point at it through `vector_id`, so identical uploads
+share the expensive artefacts and `ref_count` tracks how many records still use them.
+"""
+
+from datetime import datetime
+from uuid import uuid4
+from pymongo import ReturnDocument
+
+from server.utils.db import db_instance
+
+
+async def acquire_pdf_blob(content_hash: str, pdf_id: str, file_path: str) -> dict:
+    """
+    Takes a reference on the blob for `content_hash`, creating it (owned by `pdf_id`) if it is new.
+    Returns the blob; `blob["vector_id"] != pdf_id` means the bytes were already known.
+    The job id is reserved up front so duplicates arriving mid-ingestion can follow the same job.
+    """
+    return await db_instance.db["pdf_blobs"].find_one_and_update(
+        {"content_hash": content_hash},
+        {
+            "$inc": {"ref_count": 1},
+            "$setOnInsert": {
+                "vector_id": pdf_id,
+                "job_id": str(uuid4()),
+                "file_path": file_path,
+                "status": "processing",
+                "title": "Processing...",
+                "summary": "",
+                "created_at": datetime.utcnow()
+            }
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def release_pdf_blob(content_hash: str, vector_id: str) -> bool:
+    """
+    Drops the reference a deleted `pdfs` record held on its own blob. Returns True when nothing
+    references the vectors under `vector_id` any more (and the blob record, if any, was removed).
+    Matching on `vector_id` too matters: after a failed ingestion discards a blob, the same bytes
+    get a new blob, and records of the failed one must not release a reference on it.
+    """
+    blob = await db_instance.db["pdf_blobs"].find_one_and_update(
+        {"content_hash": content_hash, "vector_id": vector_id},
+        {"$inc": {"ref_count": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+
+    if blob is None:
+        # The blob was discarded; its vectors are only in use while another record points at them
+        return await db_instance.db["pdfs"].count_documents({"vector_id": vector_id}, limit=1) == 0
+
+    if blob["ref_count"] <= 0:
+        result = await db_instance.db["pdf_blobs"].delete_one(
+            {"content_hash": content_hash, "vector_id": vector_id, "ref_count": {"$lte": 0}}
+        )
+        return result.deleted_count == 1
+
+    return False
+
+
+async def get_pdf_blob(vector_id: str):
+    return await db_instance.db["pdf_blobs"].find_one({"vector_id": vector_id})
+
+
+async def mark_pdf_blob_ready(vector_id: str, fields: dict):
+    await db_instance.db["pdf_blobs"].update_one({"vector_id": vector_id}, {"$set": {"status": "ready", **fields}})
+
+
+async def discard_pdf_blob(vector_id: str):
+    # A failed ingestion must not be reused; the next upload of the same bytes starts over
+    await db_instance.db["pdf_blobs"].delete_one({"vector_id": vector_id})
@@ -0,0 +1,100 @@
+"""
+Parallel PDF text extraction.
+
+Large PDFs are cut into page ranges that are extracted by a pool of worker processes, each
+opening the file with PyMuPDF on its own. Pages come back as the same per-page Documents
+`PyMuPDFLoader` produces, in page order, so chunking and summarization can share one parse.
+"""
+
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+from langchain_core.documents import Document
+
+from server.utils.config import EXTRACTION_PROCESSES, EXTRACTION_PAGES_PER_RANGE
+
+# Document metadata copied onto every page, as PyMuPDFLoader does
+METADATA_KEYS = ["format", "title", "author", "subject", "keywords", "creator", "producer",
+                 "creationDate", "modDate", "trapped"]
+
+_pool = {"executor": None}
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    with _pool_lock:
+        if _pool["executor"] is None:
+            # "spawn": forking a process that already runs torch and event-loop threads is unsafe
+            _pool["executor"] = ProcessPoolExecutor(max_workers=EXTRACTION_PROCESSES,
+                                                    mp_context=multiprocessing.get_context("spawn"))
+        return _pool["executor"]
+
+
+def count_pages(file_path: str) -> int:
+    with fitz.open(file_path) as pdf:
+        return pdf.page_count
+
+
+def extract_page_range(file_path: str, start: int, end: int) -> list:
+    """
+    Extracts pages [start, end) as (text, metadata) pairs. Runs in the worker processes,
+    so it returns plain data rather than Documents.
+    """
+    with fitz.open(file_path) as pdf:
+        shared = {key: pdf.metadata.get(key, "") for key in METADATA_KEYS}
+        return [
+            (pdf[number].get_text(), {
+                "source": file_path,
+                "file_path": file_path,
+                "page": number,
+                "total_pages": pdf.page_count,
+                **shared
+            })
+            for number in range(start, min(end, pdf.page_count))
+        ]
+
+
+def iter_page_ranges(file_path: str, pages_per_range: int = EXTRACTION_PAGES_PER_RANGE):
+    """
+    Yields page Documents in order. Small files (or every file, without a pool) are extracted
+    in-process one range at a time; larger ones are spread over the pool with at most two ranges
+    per worker in flight. Either way only a few ranges of text are held in memory.
+    """
+    page_count = count_pages(file_path)
+
+    if page_count <= pages_per_range or EXTRACTION_PROCESSES <= 1:
+        ranges = (extract_page_range(file_path, start, start + pages_per_range)
+                  for start in range(0, page_count, pages_per_range))
+    else:
+        ranges = _iter_parallel_ranges(file_path, page_count, pages_per_range)
+
+    for pages in ranges:
+        for text, metadata in pages:
+            yield Document(page_content=text, metadata=metadata)
+
+
+def _iter_parallel_ranges(file_path: str, page_count: int, pages_per_range: int):
+    pool = _get_pool()
+    pending = deque()
+
+    try:
+        for start in range(0, page_count, pages_per_range):
+            pending.append(pool.submit(extract_page_range, file_path, start, start + pages_per_range))
+            if len(pending) >= EXTRACTION_PROCESSES * 2:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def shutdown_extraction_pool():
+    with _pool_lock:
+        if _pool["executor"] is not None:
+            _pool["executor"].shutdown(wait=False, cancel_futures=True)
+            _pool["executor"] = None
@@ -2,11 +2,13 @@ import random
 import string
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import uuid4
 from passlib.context import CryptContext
 from jose import jwt
 from sklearn.utils import deprecated
 from cryptography.fernet import Fernet
 
+from server.utils.cryptoExecutor import run_crypto
 from server.utils.config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_EXPIRATION_MINUTES, ENCRYPTION_KEY
 
 # key = Fernet.generate_key()
@@ -23,6 +25,14 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def averify_password(plain_password, hashed_password):
+    return await run_crypto(verify_password, plain_password, hashed_password)
+
+
+async def aget_password_hash(password):
+    return await run_crypto(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -30,7 +40,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=JWT_EXPIRATION_MINUTES)
 
-    to_encode.update({"exp": expire})
+    # jti lets logout revoke this exact token through a small in-memory set
+    to_encode.update({"exp": expire, "jti": uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
     return encoded_jwt
@@ -50,6 +61,21 @@ def decrypt_message(encrypted_message: str):
         raise ValueError("Invalid Key or Corrupted Data")
 
 
+async def aencrypt_message(message: str):
+    return await run_crypto(encrypt_message, message)
+
+
+async def adecrypt_message(encrypted_message: str):
+    return await run_crypto(decrypt_message, encrypted_message)
+
+
+async def adecrypt_messages(encrypted_messages: list) -> list:
+    """
+    Decrypts a batch in a single executor task (one queue hop for a whole history page).
+    """
+    return await run_crypto(lambda: [decrypt_message(m) for m in encrypted_messages])
+
+
 def generate_otp(length=6) -> str:
     """Generate a random numeric OTP"""
     return ''.join(random.choices(string.digits, k=length))
@@ -0,0 +1,145 @@
+"""
+Page-aware, offset-based text splitter.
+
+Pages are appended to one buffer, joined with "\n" (the layout `page_offsets` in the document
+profile describes), and chunks are cut as (start, end) offsets into it. Break points are found
+with `str.rfind` over the tail of each window, preferring paragraph, then line, then word
+boundaries, so the text is scanned once instead of being re-split recursively. A chunk's pages
+come from a binary search over the page-offset index and may span a page break.
+
+Pages can be fed one at a time: only the text not yet emitted (plus the overlap), and the pages
+it touches, are buffered, and chunks come out exactly as if the whole document had been split at once.
+"""
+
+import bisect
+from langchain_core.documents import Document
+
+SEPARATORS = ["\n\n", "\n", " "]
+
+
+class PageAwareTextSplitter:
+    """
+    Feed pages with `add_page`, then call `finish`. Both return (page index, chunk) pairs, where
+    the page index is the position of the chunk's first page in the feed. Chunk metadata is the
+    first page's metadata plus `page`/`page_end` and the chunk's `start_index`/`end_index`
+    in the joined text.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._buffer = ""
+        # Offset of _buffer[0] in the joined text, and of the next chunk's start
+        self._base = 0
+        self._start = 0
+        # Page-offset index (start of every page still in reach) and what each page contributes to
+        # chunk metadata; pages before the next chunk's start are dropped, counted in _dropped_pages
+        self._page_offsets = []
+        self._page_metadata = []
+        self._dropped_pages = 0
+
+    @property
+    def pending_page(self) -> int:
+        """
+        Index of the first page that may still appear in a future chunk; every page before it
+        is fully covered by the chunks returned so far.
+        """
+        rest = self._buffer[self._start - self._base:]
+        if not rest.strip():
+            return self._dropped_pages + len(self._page_offsets)
+        return self._page_index(self._start)
+
+    def add_page(self, doc) -> list:
+        if self._page_offsets:
+            self._buffer += "\n"
+        self._page_offsets.append(self._base + len(self._buffer))
+        metadata = dict(doc.metadata)
+        metadata.setdefault("page", self._dropped_pages + len(self._page_metadata))
+        self._page_metadata.append(metadata)
+        self._buffer += doc.page_content
+        return self._emit(final=False)
+
+    def finish(self) -> list:
+        return self._emit(final=True)
+
+    def split_documents(self, docs: list) -> list:
+        chunks = []
+        for doc in docs:
+            chunks.extend(chunk for _, chunk in self.add_page(doc))
+        chunks.extend(chunk for _, chunk in self.finish())
+        return chunks
+
+    def _page_index(self, offset: int) -> int:
+        return self._dropped_pages + bisect.bisect_right(self._page_offsets, offset) - 1
+
+    def _page_metadata_at(self, page_index: int) -> dict:
+        return self._page_metadata[page_index - self._dropped_pages]
+
+    def _find_end(self, start: int) -> int:
+        limit = start + self.chunk_size
+        if limit >= len(self._buffer):
+            return len(self._buffer)
+
+        # Break at the last separator in the second half of the window, or hard-cut
+        floor = start + self.chunk_size // 2
+        for separator in SEPARATORS:
+            position = self._buffer.rfind(separator, floor, limit)
+            if position != -1:
+                return position
+        return limit
+
+    def _next_start(self, start: int, end: int) -> int:
+        # Begin the overlap on a word boundary
+        position = max(end - self.chunk_overlap, start + 1)
+        while position < end and not self._buffer[position - 1].isspace():
+            position += 1
+        return position
+
+    def _skip_whitespace(self, position: int) -> int:
+        while position < len(self._buffer) and self._buffer[position].isspace():
+            position += 1
+        return position
+
+    def _make_chunk(self, start: int, end: int) -> tuple:
+        while end > start and self._buffer[end - 1].isspace():
+            end -= 1
+
+        global_start, global_end = self._base + start, self._base + end
+        first_page = self._page_index(global_start)
+        last_page = self._page_index(global_end - 1)
+
+        metadata = dict(self._page_metadata_at(first_page))
+        metadata["page_end"] = self._page_metadata_at(last_page)["page"]
+        metadata["start_index"] = global_start
+        metadata["end_index"] = global_end
+        return first_page, Document(page_content=self._buffer[start:end], metadata=metadata)
+
+    def _emit(self, final: bool) -> list:
+        chunks = []
+        start = self._start - self._base
+
+        while True:
+            start = self._skip_whitespace(start)
+            if start >= len(self._buffer):
+                break
+            # The window of a chunk near the end of the buffer may still grow with the next page
+            if not final and len(self._buffer) - start <= self.chunk_size:
+                break
+
+            end = self._find_end(start)
+            chunks.append(self._make_chunk(start, end))
+            if end >= len(self._buffer):
+                start = end
+                break
+            start = self._next_start(start, end)
+
+        # Drop text, and pages, no future chunk can reach
+        self._start = self._base + start
+        self._buffer = self._buffer[start:]
+        self._base += start
+        reachable = self._page_index(self._start) - self._dropped_pages
+        if reachable > 0:
+            del self._page_offsets[:reachable]
+            del self._page_metadata[:reachable]
+            self._dropped_pages += reachable
+        return chunks
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Rough resident cost of one chunk: 384 float32 dims + text/metadata + HNSW links
+ESTIMATED_BYTES_PER_CHUNK = 3 * 1024
+
+
+class VectorStoreCache:
+    """
+    Per-worker LRU of opened Chroma collections keyed by storage id.
+    Bounded by entry count and by an estimated memory budget; entries idle for longer than
+    `idle_seconds` are dropped on the next access.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, idle_seconds: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._entries = OrderedDict()  # key -> [store, estimated_bytes, last_used]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_open(self, key: str, opener):
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[2] = now
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Open outside the lock so a slow SQLite/HNSW load does not block other documents
+        store = opener()
+        estimated_bytes = store._collection.count() * ESTIMATED_BYTES_PER_CHUNK
+
+        with self._lock:
+            # Another thread may have opened the same collection meanwhile; keep the first one
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[0]
+
+            self._entries[key] = [store, estimated_bytes, now]
+            self._evict_over_budget()
+
+        return store
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "estimated_bytes": sum(entry[1] for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _evict_idle(self, now: float):
+        for key in [k for k, entry in self._entries.items() if now - entry[2] > self.idle_seconds]:
+            del self._entries[key]
+            self.evictions += 1
+
+    def _evict_over_budget(self):
+        # Always keep the most recent entry, even if it alone exceeds the memory budget
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries
+                or sum(entry[1] for entry in self._entries.values()) > self.max_bytes
+        ):
+            self._entries.popitem(last=False)
+            self.evictions += 1